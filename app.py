@@ -1,13 +1,18 @@
 import streamlit as st
 import pandas as pd
-import requests
-import json
+import os
 import datetime
-import altair as alt
 import re
-from pypdf import PdfReader
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from sheets import SheetCache, normalize_frame, build_class_index, build_counseling_index, build_weekly_index
+from sheet_sync import SheetSyncStore
+from sheet_writer import SheetWriter
+from gemini_client import GeminiClient, GeminiError, ResponseCache, cache_key
+from pdf_text import extract_pdf_text, parse_numbers, select_problems
+from report_agg import ROLLING_WINDOW, build_weekly_aggregates, period_key
+import perf
 
 # ==========================================
 # 1. 페이지 설정 및 구글 시트 연결
@@ -15,70 +20,182 @@ from oauth2client.service_account import ServiceAccountCredentials
 st.set_page_config(page_title="GoodSense Math (Web)", layout="wide")
 st.title("👨‍🏫 GoodSense Math 김성만 수학 연구소 (Web)")
 
+# 세션별 성능 측정 기록 (시트 읽기/쓰기, PDF 추출, AI 호출의 횟수·지연·전송량)
+if '_perf' not in st.session_state: st.session_state['_perf'] = perf.PerfRecorder()
+
+def _session_perf():
+    # 스크립트 실행 흐름(콜백, 일괄 분석 스레드 포함)에서만 현재 세션의 기록기를 사용
+    if get_script_run_ctx(suppress_warning=True) is None: return None
+    return st.session_state.get('_perf')
+
+perf.set_fallback(_session_perf)
+
 # [중요] 시크릿에서 키와 인증 정보 가져오기
 try:
     # 1. API 키 (secrets.toml에 GENAI_API_KEY로 저장되어 있어야 함)
     GEMINI_API_KEY = st.secrets["GENAI_API_KEY"]
     
     # 2. 구글 시트 인증 (secrets.toml에 gcp_service_account 섹션이 있어야 함)
-    scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
-    creds_dict = dict(st.secrets["gcp_service_account"])
-    creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
-    client = gspread.authorize(creds)
+    GCP_CREDS = dict(st.secrets["gcp_service_account"])
+    SCOPE = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
     
-    # 3. 구글 시트 열기 (시트 이름: "학생관리데이터")
+    # 3. 구글 시트 이름: "학생관리데이터"
     # ※ 주의: 구글 드라이브에 있는 실제 파일명과 정확히 일치해야 합니다.
     SHEET_NAME = "학생관리데이터" 
-    sh = client.open(SHEET_NAME) 
 
 except Exception as e:
     st.error(f"❌ 설정 오류: Secrets 설정이나 구글 시트 연결을 확인해주세요.\n\n에러 내용: {e}")
     st.stop()
 
+# 인증된 클라이언트 / 스프레드시트 / 워크시트 핸들은 프로세스 전체에서 공유
+# (새 세션마다 OAuth 토큰 교환과 드라이브 검색을 반복하지 않음. 실제로 시트가 필요할 때 처음 연결)
+# 토큰 만료 시 갱신은 gspread가 쓰는 google-auth 세션이 요청 시점에 자동으로 처리
+SHEET_TIMEOUT = (5, 30)  # 초 (연결, 응답). 응답 없는 요청이 쓰기 대기열 등을 붙잡고 있지 않도록
+
+@st.cache_resource
+def get_spreadsheet():
+    import gspread
+    from oauth2client.service_account import ServiceAccountCredentials
+    creds = ServiceAccountCredentials.from_json_keyfile_dict(GCP_CREDS, SCOPE)
+    client = gspread.authorize(creds)
+    client.set_timeout(SHEET_TIMEOUT)
+    perf.instrument_session(getattr(getattr(client, 'http_client', client), 'session', None))
+    return client.open(SHEET_NAME)
+
+@st.cache_resource
+def get_worksheet(worksheet_name):
+    return get_spreadsheet().worksheet(worksheet_name)
+
+def reset_sheet_connection(e):
+    # 인증 오류(401)면 공유 연결을 버리고 다음 요청 때 새로 연결
+    if getattr(getattr(e, 'response', None), 'status_code', None) == 401:
+        get_spreadsheet.clear()
+        get_worksheet.clear()
+
+def open_worksheet(worksheet_name):
+    try: get_spreadsheet()
+    except Exception as e:
+        st.error(f"❌ 설정 오류: Secrets 설정이나 구글 시트 연결을 확인해주세요.\n\n에러 내용: {e}")
+        st.stop()
+    return get_worksheet(worksheet_name)
+
 # ==========================================
 # 2. 구글 시트 읽기/쓰기 함수 (gspread 사용)
 # ==========================================
+# 워크시트별 캐시: 위젯 클릭(rerun)마다 시트 전체를 다시 받지 않도록 함
+SHEET_CACHE_TTL = 300  # 초 (다른 강사가 입력한 내용은 최대 이 시간 뒤에 반영)
+# 행이 추가되기만 하는 시트는 로컬 SQLite에 쌓아두고 새로 추가된 행만 받아옴 (값은 문자열 그대로)
+SYNCED_SHEETS = ('weekly', 'counseling')
+
+@st.cache_resource
+def get_sheet_cache():
+    return SheetCache(ttl=SHEET_CACHE_TTL, max_entries=8, string_sheets=SYNCED_SHEETS)
+
+LOCAL_STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "sheets.sqlite3")
+# 시트에서 이전 행을 직접 고친 내용은 증분 동기화로 알 수 없으므로 이 주기마다 전체를 다시 받음
+SYNC_FULL_INTERVAL = 3600  # 초
+
+@st.cache_resource
+def get_sync_store():
+    return SheetSyncStore(LOCAL_STORE_PATH, full_sync_interval=SYNC_FULL_INTERVAL)
+
+@perf.track(lambda worksheet_name: f"sheet.load:{worksheet_name}")
 def load_data_from_gsheet(worksheet_name):
+    cache = get_sheet_cache()
+    df = cache.get(worksheet_name)
+    if df is not None: return df
     try:
-        worksheet = sh.worksheet(worksheet_name)
-        data = worksheet.get_all_records()
-        df = pd.DataFrame(data)
-        
-        # 숫자형 변환 (주간 시트)
-        if worksheet_name == 'weekly':
-            numeric_cols = ['주간점수', '주간평균', '성취도점수', '성취도평균', '과제']
-            for col in numeric_cols:
-                if col in df.columns:
-                    # 빈 문자열이나 에러가 날 경우 0으로 처리
-                    df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-        
-        # 날짜/시기 문자열 변환
-        if '날짜' in df.columns: df['날짜'] = df['날짜'].astype(str)
-        if '시기' in df.columns: df['시기'] = df['시기'].astype(str)
+        worksheet = open_worksheet(worksheet_name)
+        if worksheet_name in SYNCED_SHEETS:
+            store = get_sync_store()
+            full, rows = store.sync(worksheet)
+            # 증분 동기화면 새 행만 캐시에 덧붙임 (인덱스/집계도 유지). 전체를 다시 받았을 때만 새로 읽음
+            if not full and cache.renew(worksheet_name, rows): return cache.get(worksheet_name)
+            df = normalize_frame(worksheet_name, store.read_frame(worksheet_name))
+        else:
+            data = worksheet.get_all_records()
+            df = normalize_frame(worksheet_name, pd.DataFrame(data))
+        cache.put(worksheet_name, df)
         return df
     except Exception as e:
+        reset_sheet_connection(e)
         st.warning(f"데이터 로드 중: '{worksheet_name}' 시트를 찾을 수 없거나 비어있습니다.")
         return pd.DataFrame()
 
-def add_row_to_gsheet(worksheet_name, row_data_list):
+def load_index(worksheet_name, builder):
+    # 데이터 적재 1회당 한 번만 인덱스를 만들고 rerun 간에 재사용
+    df = load_data_from_gsheet(worksheet_name)
+    return df, get_sheet_cache().index(worksheet_name, builder, df)
+
+# 쓰기 대기열: 로컬 저널에 먼저 기록한 뒤 워크시트별로 모아서 append_rows로 전송
+# 전송에 성공한 행은 해당 시트 캐시에만 덧붙임 (다른 시트 캐시는 그대로 유지)
+@st.cache_resource
+def get_sheet_writer():
+    writer = SheetWriter(LOCAL_STORE_PATH, get_worksheet=get_worksheet, on_flushed=get_sheet_cache().patch)
+    writer.start()
+    return writer
+
+@perf.track(lambda worksheet_name, rows: f"sheet.write:{worksheet_name}")
+def add_rows_to_gsheet(worksheet_name, rows):
     try:
-        worksheet = sh.worksheet(worksheet_name)
         # 리스트 내용을 문자열로 변환해서 저장 (안전성 확보)
-        safe_row = [str(x) if x is not None else "" for x in row_data_list]
-        worksheet.append_row(safe_row)
+        safe_rows = [[str(x) if x is not None else "" for x in row] for row in rows]
+        writer = get_sheet_writer()
+        ids = writer.enqueue(worksheet_name, safe_rows)
+        writer.flush(worksheet_name, max_attempts=3)
+        pending, failed = writer.outcome(ids)
+        if failed:
+            # 재시도해도 소용없는 오류 → 실패 행으로 보관 (사이드바에서 다시 시도/내보내기/버리기)
+            st.error(f"저장 실패: {failed[0]}")
+            return False
+        if pending:
+            # 저널에 남아 있으므로 데이터는 유실되지 않음 (백그라운드에서 계속 재시도)
+            err = writer.status().get(worksheet_name, {}).get('last_error')
+            st.warning(f"⏳ 구글 시트 전송 대기 중 - 자동으로 다시 전송합니다.\n\n{err or ''}")
         return True
     except Exception as e:
         st.error(f"저장 실패: {e}")
         return False
 
+def add_row_to_gsheet(worksheet_name, row_data_list):
+    return add_rows_to_gsheet(worksheet_name, [row_data_list])
+
+def show_write_status():
+    # 전송 대기 중이거나 실패한 행이 있으면 사이드바에 표시
+    writer = get_sheet_writer()
+    status = writer.status()
+    waiting = {name: s for name, s in status.items() if s['pending']}
+    for name, s in waiting.items():
+        msg = f"⏳ '{name}' 시트 전송 대기 {s['pending']}건"
+        if s['last_error']: msg += f"\n\n마지막 오류: {s['last_error']}"
+        st.sidebar.warning(msg)
+    if waiting and st.sidebar.button("지금 다시 전송"):
+        writer.flush(max_attempts=1)
+        st.rerun()
+
+    failed = writer.failed_rows()
+    if not failed: return
+    with st.sidebar.expander(f"❌ 저장 실패 {len(failed)}건", expanded=True):
+        for f in failed[:5]: st.caption(f"[{f['sheet']}] {' / '.join(f['row'][:2])} - {f['error']}")
+        export = pd.DataFrame([{'시트': f['sheet'], '오류': f['error'], **{f'열{i + 1}': v for i, v in enumerate(f['row'])}} for f in failed])
+        st.download_button("CSV로 내보내기", export.to_csv(index=False).encode('utf-8-sig'), file_name="failed_rows.csv", mime="text/csv")
+        c1, c2 = st.columns(2)
+        if c1.button("다시 시도", key="failed_retry"):
+            writer.requeue_failed([f['id'] for f in failed])
+            writer.flush(max_attempts=1)
+            st.rerun()
+        if c2.button("버리기", key="failed_discard"):
+            writer.discard_failed([f['id'] for f in failed])
+            st.rerun()
+
 # ==========================================
 # 3. 유틸리티 & AI (전문가 어조 적용됨)
 # ==========================================
 def sort_numbers_string(text):
     if not text: return ""
-    numbers = re.findall(r'\d+', str(text))
+    numbers = parse_numbers(text)
     if not numbers: return text
-    return ", ".join(map(str, sorted([int(n) for n in numbers])))
+    return ", ".join(map(str, numbers))
 
 def clean_class_name(text):
     if not text: return ""
@@ -91,11 +208,67 @@ def clean_school_name(text, target_type="middle"):
     if target_type == "middle": return root_name + "중"
     else: return root_name + "고"
 
-def refine_text_ai(raw_text, context_type, student_name):
+GEMINI_MODEL = "gemini-2.0-flash-exp"
+
+@st.cache_resource
+def get_gemini_client():
+    # 세션(커넥션 풀)과 동시 호출 제한을 모든 사용자 세션이 공유
+    client = GeminiClient(GEMINI_API_KEY, model=GEMINI_MODEL, timeout=(5, 60), max_retries=3, max_concurrency=4)
+    perf.instrument_session(client.session)
+    return client
+
+# 같은 입력(모델 + 프롬프트 + 대상)의 AI 결과는 로컬에 저장해 두고 재사용
+AI_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "ai_cache.sqlite3")
+
+@st.cache_resource
+def get_ai_cache():
+    return ResponseCache(AI_CACHE_PATH, ttl=7 * 24 * 3600, max_entries=2000)
+
+def stream_gemini(prompt, placeholder):
+    # 생성되는 대로 placeholder에 표시. 도중에 끊기면 일반 호출로 전체를 다시 받음
+    client = get_gemini_client()
+    text = ""
+    try:
+        for chunk in client.stream(prompt):
+            text += chunk
+            placeholder.markdown(text + "▌")
+    except GeminiError:
+        # 빈 스트림은 stream()이 이미 generate()로 대신 받아옴 → 받다가 끊긴 경우에만 다시 요청
+        if not text: raise
+        text = client.generate(prompt)
+    placeholder.empty()
+    return text
+
+def call_gemini(prompt, target_audience=None, refresh=False, placeholder=None):
+    # refresh=True: 저장된 결과를 쓰지 않고 새로 생성 (새 결과로 캐시 갱신)
+    # placeholder(st.empty())를 주면 스트리밍으로 받아 생성 중인 내용을 바로 보여줌
+    def produce():
+        if placeholder is None: return get_gemini_client().generate(prompt)
+        return stream_gemini(prompt, placeholder)
+    try:
+        return get_ai_cache().get_or_create(cache_key(GEMINI_MODEL, prompt, target_audience), produce, refresh=refresh)
+    except GeminiError as e:
+        if e.status_code: return f"AI 에러: {e.status_code}"
+        return f"통신 에러: {e}"
+
+# AI에 보내는 PDF 텍스트 최대 길이 (틀린 문제만 골라낸 뒤 적용)
+AI_TEXT_BUDGET = 15000
+# PDF에서 추출하는 최대 길이 (뒤쪽 문제도 번호로 찾을 수 있도록 넉넉하게)
+PDF_TEXT_LIMIT = 300000
+
+def read_pdf_upload(up):
+    # 같은 파일이면 파일 내용 해시 기준 캐시에서 바로 반환 (rerun마다 다시 파싱하지 않음)
+    with perf.timed("pdf.extract") as m:
+        try:
+            data = up.getvalue()
+            m['bytes'] = len(data)
+            return extract_pdf_text(data, max_chars=PDF_TEXT_LIMIT)
+        except Exception: return ""
+
+@perf.track("ai.refine")
+def refine_text_ai(raw_text, context_type, student_name, refresh=False, placeholder=None):
     if not raw_text: return ""
     try:
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash-exp:generateContent?key={GEMINI_API_KEY}"
-        headers = {'Content-Type': 'application/json'}
         prompt = f"""
         학생: {student_name}
         내용: {raw_text}
@@ -108,22 +281,19 @@ def refine_text_ai(raw_text, context_type, student_name):
         3. **어조:** - 학생의 성장은 강사의 지도와 학생의 의지, 가정의 관심이 함께해야 함을 전제하는 차분하고 객관적인 전문가의 말투.
            - 성적 향상에는 시간이 필요할 수 있음을(기다림의 여지) 내포할 것.
         """
-        data = {"contents": [{"parts": [{"text": prompt}]}]}
-        res = requests.post(url, headers=headers, data=json.dumps(data))
-        if res.status_code == 200: return res.json()['candidates'][0]['content']['parts'][0]['text']
-        else: return f"AI 에러: {res.status_code}"
+        return call_gemini(prompt, refresh=refresh, placeholder=placeholder)
     except Exception as e: return f"통신 에러: {e}"
 
-def analyze_homework_ai(student_name, wrong_numbers, assignment_text, type_name="과제", target_audience="학부모 전송용"):
+@perf.track("ai.analyze")
+def analyze_homework_ai(student_name, wrong_numbers, assignment_text, type_name="과제", target_audience="학부모 전송용", refresh=False, placeholder=None):
     if not wrong_numbers or not assignment_text: return "내용 부족"
     try:
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash-exp:generateContent?key={GEMINI_API_KEY}"
-        headers = {'Content-Type': 'application/json'}
-        
+        # 틀린 문제만 골라서 전송 (번호를 못 찾으면 앞부분 AI_TEXT_BUDGET 글자)
+        problem_text = select_problems(assignment_text, wrong_numbers, max_chars=AI_TEXT_BUDGET)
         if target_audience == "학부모 전송용":
             prompt = f"""
             학생: {student_name}, 오답: {wrong_numbers}, 유형: {type_name}
-            텍스트: {assignment_text[:15000]}
+            텍스트: {problem_text}
             
             [학부모 전송용 분석 보고서 작성 지침]
             1. **인사말 생략:** 불필요한 감사 인사 없이 바로 "금주 {type_name} 분석 결과입니다."로 시작.
@@ -135,19 +305,65 @@ def analyze_homework_ai(student_name, wrong_numbers, assignment_text, type_name=
         else:
             prompt = f"""
             학생: {student_name}, 오답: {wrong_numbers}, 유형: {type_name}
-            텍스트: {assignment_text[:15000]}
+            텍스트: {problem_text}
             [학생 본인용 피드백] 따뜻하지만 단호한 선생님 말투. 1.유형 분석 2.노력 강조 3.질문 유도.
             """
-        data = {"contents": [{"parts": [{"text": prompt}]}]}
-        res = requests.post(url, headers=headers, data=json.dumps(data))
-        if res.status_code == 200: return res.json()['candidates'][0]['content']['parts'][0]['text']
-        else: return f"AI 에러: {res.status_code}"
+        return call_gemini(prompt, target_audience, refresh=refresh, placeholder=placeholder)
     except Exception as e: return f"통신 에러: {e}"
 
+BULK_MAX_WORKERS = 8
+
+def run_bulk_analysis(jobs, target_audience, refresh=False, on_progress=None):
+    # jobs: [(이름, 오답, PDF 텍스트, 유형)] → {(이름, 유형): 분석 결과}
+    # 동시에 여러 건을 요청하되, 실제 동시 호출 수는 Gemini 클라이언트의 세마포어가 제한
+    ctx = get_script_run_ctx()
+    results = {}
+    with ThreadPoolExecutor(max_workers=BULK_MAX_WORKERS, initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx)) as pool:
+        futures = {pool.submit(analyze_homework_ai, name, wrong, text, type_name, target_audience, refresh): (name, type_name)
+                   for name, wrong, text, type_name in jobs}
+        for i, fut in enumerate(as_completed(futures), 1):
+            key = futures[fut]
+            try: results[key] = fut.result()
+            except Exception as e: results[key] = f"통신 에러: {e}"
+            if on_progress: on_progress(i, len(futures), key[0])
+    return results
+
+def is_admin():
+    # 관리자용 메뉴: secrets.toml에 ADMIN_MODE = true 이거나 주소에 ?admin=1
+    return bool(st.secrets.get("ADMIN_MODE", False) or st.query_params.get("admin") == "1")
+
+def show_sync_panel():
+    if not is_admin(): return
+    store = get_sync_store()
+    with st.sidebar.expander("🔄 시트 동기화"):
+        for name in SYNCED_SHEETS:
+            at = store.last_full_sync(name)
+            when = datetime.datetime.fromtimestamp(at).strftime('%m-%d %H:%M') if at else "-"
+            st.caption(f"{name}: 마지막 전체 동기화 {when}")
+        if st.button("전체 다시 받기", key="sync_reset", help="로컬 저장소를 비우고 구글 시트에서 전체를 다시 받습니다."):
+            store.reset()
+            get_sheet_cache().invalidate()
+            st.rerun()
+
+def show_perf_panel():
+    if not is_admin(): return
+    rec = st.session_state['_perf']
+    with st.sidebar.expander("⏱️ 성능 측정 (이 세션)"):
+        rows = rec.summary()
+        if rows: st.dataframe(pd.DataFrame(rows), hide_index=True)
+        else: st.caption("아직 측정된 호출이 없습니다.")
+        c1, c2 = st.columns(2)
+        c1.download_button("JSON", rec.to_json(), file_name="perf.json", mime="application/json")
+        c2.download_button("CSV", rec.to_csv(), file_name="perf.csv", mime="text/csv")
+        if st.button("측정 초기화", key="perf_reset"):
+            rec.reset()
+            st.rerun()
+
 # ==========================================
 # 4. 메인 화면 로직 (리포트 UI 개선됨)
 # ==========================================
 menu = st.sidebar.radio("메뉴", ["학생 관리", "신규 등록"], label_visibility="collapsed")
+show_write_status()
 
 if menu == "신규 등록":
     st.header("📝 신규 학생 등록 (Web)")
@@ -162,33 +378,34 @@ if menu == "신규 등록":
             if name:
                 if add_row_to_gsheet("students", [name, clean_class_name(ban), clean_school_name(origin), clean_school_name(target,'high'), addr]):
                     st.success(f"{name} 등록 완료!")
-                    st.cache_data.clear() # 데이터 갱신
 
 elif menu == "학생 관리":
-    df_std = load_data_from_gsheet("students")
+    df_std, class_idx = load_index("students", build_class_index)
     if not df_std.empty:
         if '반' in df_std.columns:
-            ban_list = sorted(df_std['반'].unique().tolist())
+            ban_list = sorted(class_idx.keys())
             sel_ban = st.sidebar.selectbox("반", ban_list)
-            std_list = sorted(df_std[df_std['반']==sel_ban]['이름'].tolist())
+            std_list = class_idx.get(sel_ban, [])
             sel_std = st.sidebar.selectbox("학생", std_list)
         else: sel_std = None
         
         if sel_std:
             st.sidebar.markdown(f"**{sel_std}** 선택됨")
-            tab = st.radio("기능", ["상담 일지", "성적 입력", "리포트"], horizontal=True, label_visibility="collapsed")
+            ai_refresh = st.sidebar.checkbox("AI 결과 새로 생성", help="같은 입력이라도 저장된 결과를 쓰지 않고 다시 생성합니다.")
+            tab = st.radio("기능", ["상담 일지", "성적 입력", "리포트", "반 일괄 분석"], horizontal=True, label_visibility="collapsed")
             st.divider()
             
             if tab == "상담 일지":
-                df_c = load_data_from_gsheet("counseling")
+                df_c, c_idx = load_index("counseling", build_counseling_index)
                 with st.expander("기록 보기"):
                     if not df_c.empty:
-                        logs = df_c[df_c['이름']==sel_std].sort_values('날짜', ascending=False)
-                        for _, r in logs.iterrows(): st.info(f"[{r['날짜']}] {r['내용']}")
+                        logs = c_idx.get(sel_std)
+                        if logs is not None:
+                            for _, r in logs.iterrows(): st.info(f"[{r['날짜']}] {r['내용']}")
                 d = st.date_input("날짜", datetime.date.today())
                 raw = st.text_area("메모", key="c_raw_input")
                 if st.button("AI 변환"):
-                    st.session_state['c_final_input'] = refine_text_ai(raw, "상담", sel_std)
+                    st.session_state['c_final_input'] = refine_text_ai(raw, "상담", sel_std, refresh=ai_refresh, placeholder=st.empty())
                     st.rerun()
                 st.text_area("최종", key="c_final_input")
                 
@@ -196,11 +413,10 @@ elif menu == "학생 관리":
                 def save_counseling():
                     content = st.session_state['c_final_input'] if st.session_state['c_final_input'] else st.session_state['c_raw_input']
                     if content:
-                        add_row_to_gsheet("counseling", [sel_std, str(d), content])
-                        st.toast("저장 완료!")
-                        st.session_state['c_raw_input'] = ""
-                        st.session_state['c_final_input'] = ""
-                        st.cache_data.clear()
+                        if add_row_to_gsheet("counseling", [sel_std, str(d), content]):
+                            st.toast("저장 완료!")
+                            st.session_state['c_raw_input'] = ""
+                            st.session_state['c_final_input'] = ""
 
                 st.button("저장", on_click=save_counseling)
 
@@ -226,18 +442,17 @@ elif menu == "학생 관리":
                 with st.expander("PDF 분석"):
                     up = st.file_uploader("과제 PDF", type=["pdf"], key="f1")
                     if up: 
-                        try: st.session_state['g_pdf_text'] = "".join([p.extract_text() for p in PdfReader(up).pages])
-                        except: pass
+                        st.session_state['g_pdf_text'] = read_pdf_upload(up)
                     tgt = st.radio("대상", ["학부모 전송용", "학생 배부용"], horizontal=True, key="t1")
                     if st.button("분석 실행", key="b1"):
-                        st.session_state['g_w_analysis'] = analyze_homework_ai(sel_std, st.session_state['g_wrong'], st.session_state['g_pdf_text'], "주간과제", tgt)
+                        st.session_state['g_w_analysis'] = analyze_homework_ai(sel_std, st.session_state['g_wrong'], st.session_state['g_pdf_text'], "주간과제", tgt, refresh=ai_refresh, placeholder=st.empty())
                         st.rerun()
                 st.text_area("분석결과", key="g_w_analysis")
                 st.divider()
                 st.subheader("📢 태도")
                 rm = st.text_area("메모", key="g_raw_m")
                 if st.button("다듬기", key="b2"):
-                    st.session_state['g_final_m'] = refine_text_ai(rm, "태도", sel_std)
+                    st.session_state['g_final_m'] = refine_text_ai(rm, "태도", sel_std, refresh=ai_refresh, placeholder=st.empty())
                     st.rerun()
                 st.text_area("최종", key="g_final_m")
                 st.divider()
@@ -250,17 +465,16 @@ elif menu == "학생 관리":
                 with st.expander("시험지 분석"):
                     up2 = st.file_uploader("시험지 PDF", type=["pdf"], key="f2")
                     if up2:
-                        try: st.session_state['g_ach_pdf_text'] = "".join([p.extract_text() for p in PdfReader(up2).pages])
-                        except: pass
+                        st.session_state['g_ach_pdf_text'] = read_pdf_upload(up2)
                     tgt2 = st.radio("대상", ["학부모 전송용", "학생 배부용"], horizontal=True, key="t2")
                     if st.button("분석 실행", key="b3"):
-                        st.session_state['g_a_analysis'] = analyze_homework_ai(sel_std, st.session_state['g_a_wrong'], st.session_state['g_ach_pdf_text'], "성취도", tgt2)
+                        st.session_state['g_a_analysis'] = analyze_homework_ai(sel_std, st.session_state['g_a_wrong'], st.session_state['g_ach_pdf_text'], "성취도", tgt2, refresh=ai_refresh, placeholder=st.empty())
                         st.rerun()
                 st.text_area("분석결과", key="g_a_analysis")
                 st.subheader("📝 총평")
                 rr = st.text_area("메모", key="g_raw_r")
                 if st.button("다듬기", key="b4"):
-                    st.session_state['g_final_r'] = refine_text_ai(rr, "총평", sel_std)
+                    st.session_state['g_final_r'] = refine_text_ai(rr, "총평", sel_std, refresh=ai_refresh, placeholder=st.empty())
                     st.rerun()
                 st.text_area("최종", key="g_final_r")
                 
@@ -298,16 +512,19 @@ elif menu == "학생 관리":
                         st.session_state['g_w_av'] = 0
                         st.session_state['g_a_sc'] = 0
                         st.session_state['g_a_av'] = 0
-                        st.cache_data.clear()
 
                 st.button("💾 저장하기", type="primary", on_click=save_grades)
 
             elif tab == "리포트":
-                df_w = load_data_from_gsheet("weekly")
+                df_w, w_idx = load_index("weekly", build_weekly_index)
+                # 학생별 추이(시기순 점수, 이동평균, 반 내 백분위)는 행이 추가될 때마다 미리 집계해 둔 것을 사용
+                # (인덱스와 같은 DataFrame에서 받아야 시기 목록과 행 위치가 어긋나지 않음)
+                w_agg = get_sheet_cache().index("weekly", build_weekly_aggregates, df_w)
+                w_agg.set_classes(class_idx)
                 if not df_w.empty:
-                    my_w = df_w[df_w['이름']==sel_std]
-                    if not my_w.empty:
-                        pers = my_w['시기'].tolist()
+                    if w_idx.by_student.get(sel_std):
+                        pers = w_agg.periods(sel_std)
+                        series = w_agg.student_series(sel_std).set_index('시기', drop=False)
                         
                         # [상단 배치] 리포트 설정
                         st.subheader("🖨️ 리포트 출력 설정")
@@ -322,14 +539,19 @@ elif menu == "학생 관리":
                         st.divider() 
 
                         if sel_p:
+                            sel_p = sorted(sel_p, key=period_key)
                             if len(sel_p) > 1:
+                                import altair as alt  # 차트를 그릴 때만 로드
                                 st.subheader("📊 성적 추이")
-                                chart_data = my_w[my_w['시기'].isin(sel_p)][['시기','주간점수','성취도점수']].melt('시기', var_name='종류', value_name='점수')
-                                chart = alt.Chart(chart_data).mark_line(point=True).encode(x=alt.X('시기', sort=None), y=alt.Y('점수', scale=alt.Scale(domain=[0,100])), color='종류').interactive()
+                                chart_data = series.loc[sel_p, ['시기','주간점수','성취도점수']].melt('시기', var_name='종류', value_name='점수')
+                                chart = alt.Chart(chart_data).mark_line(point=True).encode(x=alt.X('시기', sort=sel_p), y=alt.Y('점수', scale=alt.Scale(domain=[0,100])), color='종류').interactive()
                                 st.altair_chart(chart, use_container_width=True)
 
                             for p in sel_p:
-                                r = my_w[my_w['시기']==p].iloc[0]
+                                # 다른 세션이 방금 추가한 행은 이 df_w에 없을 수 있음 → 다음 rerun에서 표시
+                                pos = w_idx.by_period.get((sel_std, p))
+                                if pos is None or pos >= len(df_w): continue
+                                r = df_w.iloc[pos]
                                 st.markdown(f"### 🗓️ {p} 리포트")
                                 if show_score:
                                     st.info(f"**{r.get('과제명','-')} / {r.get('시험명','-')}**")
@@ -337,6 +559,11 @@ elif menu == "학생 관리":
                                     c1.metric("주간", f"{r.get('주간점수',0)}", f"Avg {r.get('주간평균',0)}")
                                     c2.metric("성취도", f"{r.get('성취도점수',0)}", f"Avg {r.get('성취도평균',0)}")
                                     c3.metric("수행도", f"{r.get('과제',0)}%")
+                                    agg_r = series.loc[p].map(lambda v: "-" if pd.isna(v) else v)  # 점수가 없는 항목은 "-"
+                                    trend = f"최근 {ROLLING_WINDOW}회 평균 주간 {agg_r['주간점수_이동평균']} · 성취도 {agg_r['성취도점수_이동평균']}"
+                                    if agg_r['주간점수_백분위'] != "-" or agg_r['성취도점수_백분위'] != "-":
+                                        trend += f" / {sel_ban}반 내 백분위 주간 {agg_r['주간점수_백분위']} · 성취도 {agg_r['성취도점수_백분위']}"
+                                    st.caption(trend)
                                 if show_weekly and r.get('주간분석'): st.success(f"**주간 과제 분석**\n\n{r.get('주간분석','')}")
                                 if show_attitude and r.get('특이사항'): st.warning(f"**학습 태도**\n\n{r.get('특이사항','')}")
                                 if show_achieve:
@@ -347,3 +574,86 @@ elif menu == "학생 관리":
                                 st.divider()
                     else: st.info("데이터 없음")
                 else: st.info("데이터 없음")
+
+            elif tab == "반 일괄 분석":
+                st.subheader(f"👥 {sel_ban}반 일괄 분석")
+                c1, c2 = st.columns(2)
+                bm = c1.selectbox("월", [f"{i}월" for i in range(1,13)], key="bulk_m")
+                bw = c2.selectbox("주", [f"{i}주차" for i in range(1,6)], key="bulk_w")
+                b_period = f"{bm} {bw}"
+                c3, c4 = st.columns(2)
+                b_hw_name = c3.text_input("과제명", key="bulk_hw_name")
+                b_ach_name = c4.text_input("시험명", key="bulk_ach_name")
+                b_hw_up = c3.file_uploader("과제 PDF", type=["pdf"], key="bulk_hw_pdf")
+                b_ach_up = c4.file_uploader("시험지 PDF", type=["pdf"], key="bulk_ach_pdf")
+                b_tgt = st.radio("대상", ["학부모 전송용", "학생 배부용"], horizontal=True, key="bulk_tgt")
+
+                # 학생별 점수/오답 표 - 학생 한 명 = weekly 한 행 (성적 입력 탭과 같은 구성)
+                # 표에 직접 붙여넣거나 CSV 업로드: 이름, 수행도, 주간점수, 주간평균, 주간오답, 성취도점수, 성취도평균, 성취도오답
+                defaults = {'수행도': 80, '주간점수': 0, '주간평균': 0, '주간오답': "", '성취도점수': 0, '성취도평균': 0, '성취도오답': ""}
+                table = pd.DataFrame({'이름': std_list, **defaults})
+                b_csv = st.file_uploader("점수/오답표 CSV (선택)", type=["csv"], key="bulk_csv")
+                if b_csv:
+                    try:
+                        up_df = pd.read_csv(b_csv, dtype=str).fillna("")
+                        table = table[['이름']].merge(up_df, on='이름', how='left').reindex(columns=table.columns).fillna(defaults)
+                    except Exception as e: st.warning(f"CSV를 읽을 수 없습니다: {e}")
+                edited = st.data_editor(table, hide_index=True, disabled=['이름'], key=f"bulk_table_{sel_ban}")
+
+                def filled(score, wrong):
+                    # 점수나 오답이 입력된 학생 (빈 칸/0점이면서 오답도 없으면 미입력으로 봄)
+                    return (pd.to_numeric(score, errors='coerce').fillna(0) != 0) | (wrong.astype(str).str.strip() != "")
+
+                if st.button("일괄 분석 실행", key="bulk_run"):
+                    jobs = []
+                    for col, up, type_name in [('주간오답', b_hw_up, "주간과제"), ('성취도오답', b_ach_up, "성취도")]:
+                        wrongs = [(r['이름'], sort_numbers_string(r[col])) for _, r in edited.iterrows() if str(r[col]).strip()]
+                        if not wrongs: continue
+                        pdf_text = read_pdf_upload(up) if up else ""
+                        if not pdf_text:
+                            st.warning(f"{type_name} PDF를 올려주세요. (분석 없이 점수만 저장할 수 있습니다)")
+                            continue
+                        jobs += [(name, wrong, pdf_text, type_name) for name, wrong in wrongs]
+                    analyses = {}
+                    if jobs:
+                        bar = st.progress(0.0, text="분석 준비 중...")
+                        def on_progress(done, total, name):
+                            bar.progress(done / total, text=f"{done}/{total} 완료 ({name})")
+                        analyses = run_bulk_analysis(jobs, b_tgt, ai_refresh, on_progress)
+                    out = edited.copy()
+                    out.insert(out.columns.get_loc('주간오답') + 1, '주간분석', [analyses.get((n, "주간과제"), "") for n in out['이름']])
+                    out['성취도분석'] = [analyses.get((n, "성취도"), "") for n in out['이름']]
+                    # 점수도 오답도 없는 학생(결석 등)과 이미 이 시기 기록이 있는 학생은 기본으로 저장에서 제외
+                    # (리포트는 (이름, 시기)의 첫 행만 쓰므로 빈 행이나 중복 행이 실제 기록을 가릴 수 있음)
+                    _, w_idx = load_index("weekly", build_weekly_index)
+                    existing = [n for n in out['이름'] if (n, b_period) in w_idx.by_period]
+                    has_data = filled(out['주간점수'], out['주간오답']) | filled(out['성취도점수'], out['성취도오답'])
+                    out.insert(0, '포함', has_data & ~out['이름'].isin(existing))
+                    st.session_state['bulk_result'] = {'ban': sel_ban, 'period': b_period, 'hw_name': b_hw_name, 'ach_name': b_ach_name,
+                                                       'table': out, 'existing': existing}
+
+                res = st.session_state.get('bulk_result')
+                if res and res['ban'] == sel_ban:
+                    st.caption(f"{res['period']} · 과제 {res['hw_name'] or '-'} · 시험 {res['ach_name'] or '-'} (분석 내용은 저장 전에 수정할 수 있습니다)")
+                    if res['existing']: st.caption(f"⚠️ 이미 {res['period']} 기록이 있어 제외됨: {', '.join(res['existing'])}")
+                    final = st.data_editor(res['table'], hide_index=True, disabled=['이름'], key="bulk_review")
+                    if st.button("💾 일괄 저장", type="primary", key="bulk_save"):
+                        final = final[final['포함'].astype(bool)]
+                        hw_in, ach_in = filled(final['주간점수'], final['주간오답']), filled(final['성취도점수'], final['성취도오답'])
+                        rows = []
+                        for (_, r), hw, ach in zip(final.iterrows(), hw_in, ach_in):
+                            # weekly 열 순서: 이름, 시기, 과제명, 과제, 주간점수, 주간평균, 주간오답, 주간분석,
+                            #               특이사항, 시험명, 성취도점수, 성취도평균, 성취도오답, 성취도분석, 총평
+                            # 입력하지 않은 쪽(과제 또는 성취도)은 빈 칸으로 저장 (0점으로 기록되지 않도록)
+                            hw_part = [res['hw_name'], r['수행도'], r['주간점수'], r['주간평균'], sort_numbers_string(r['주간오답']), r['주간분석']] if hw else [""] * 6
+                            ach_part = [res['ach_name'], r['성취도점수'], r['성취도평균'], sort_numbers_string(r['성취도오답']), r['성취도분석']] if ach else [""] * 5
+                            rows.append([r['이름'], res['period']] + hw_part + [""] + ach_part + [""])
+                        # 반 전체를 append_rows 한 번으로 저장
+                        if not rows: st.warning("저장할 학생이 없습니다. ('포함'을 선택하세요)")
+                        elif add_rows_to_gsheet("weekly", rows):
+                            st.toast(f"{len(rows)}명 저장 완료!")
+                            del st.session_state['bulk_result']
+                            st.rerun()
+
+show_sync_panel()
+show_perf_panel()
\ No newline at end of file
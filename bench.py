@@ -0,0 +1,234 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+import perf
+from gemini_client import GeminiClient, ResponseCache, cache_key
+from report_agg import build_weekly_aggregates
+from sheet_sync import SheetSyncStore
+from sheet_writer import SheetWriter
+from sheets import SheetCache, build_class_index, build_weekly_index, normalize_frame
+
+# ==========================================
+# 오프라인 벤치마크 (가짜 구글 시트 + 로컬 가짜 Gemini 서버)
+# ==========================================
+# 사용법: python bench.py [--sizes 1000,10000,100000] [--reruns 50] [--json 결과.json]
+# 주간(weekly) 행 수별로 데이터 경로(동기화/정규화/인덱스), 리포트 rerun 경로,
+# 쓰기 대기열, AI 호출(동시 호출/캐시/스트리밍 첫 조각)을 측정해 p50/p95를 출력합니다.
+WEEKLY_HEADERS = ['이름', '시기', '과제명', '과제', '주간점수', '주간평균', '주간오답', '주간분석',
+                  '특이사항', '시험명', '성취도점수', '성취도평균', '성취도오답', '성취도분석', '총평']
+CLASS_SIZE = 20
+
+
+class FakeWorksheet:
+    # gspread Worksheet 중 앱이 쓰는 메서드만 메모리로 흉내냄 (latency: 호출당 지연 초)
+    def __init__(self, title, rows, latency=0.0):
+        self.title = title
+        self.rows = rows
+        self.latency = latency
+        self.calls = 0
+
+    def _call(self):
+        self.calls += 1
+        if self.latency: time.sleep(self.latency)
+
+    def get_values(self, range_name=None):
+        self._call()
+        return [list(r) for r in self.rows]
+
+    def get_all_records(self):
+        self._call()
+        head = self.rows[0]
+        return [dict(zip(head, r)) for r in self.rows[1:]]
+
+    def batch_get(self, ranges):
+        self._call()
+        out = []
+        for rng in ranges:
+            if rng == "1:1": out.append([list(self.rows[0])])
+            else:
+                start = int(rng.split(":")[0][1:])
+                out.append([list(r) for r in self.rows[start - 1:]])
+        return out
+
+    def append_rows(self, rows):
+        self._call()
+        self.rows.extend([list(r) for r in rows])
+
+
+def synthetic_weekly(n_rows, seed=0):
+    rnd = random.Random(seed)
+    n_students = max(CLASS_SIZE, n_rows // 48)
+    names = [f"학생{i:05d}" for i in range(n_students)]
+    rows = [WEEKLY_HEADERS]
+    for i in range(n_rows):
+        name = names[i % n_students]
+        k = i // n_students
+        period = f"{k // 4 % 12 + 1}월 {k % 4 + 1}주차"
+        w_sc, a_sc = rnd.randint(30, 100), rnd.randint(30, 100)
+        rows.append([name, period, f"과제{k}", "80", str(w_sc), "70", "1, 3, 5", "분석 " * 20,
+                     "태도 양호", f"시험{k}", str(a_sc), "65", "2, 4", "성취도 분석 " * 20, "총평 " * 10])
+    classes = {f"A{j // CLASS_SIZE}": names[j:j + CLASS_SIZE] for j in range(0, n_students, CLASS_SIZE)}
+    return rows, names, classes
+
+
+class _GeminiStub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.05
+
+    def log_message(self, *args): pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.latency)
+        text = "분석 결과 " * 50
+        if "stream" in self.path:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            for i in range(0, len(text), 40):
+                chunk = {"candidates": [{"content": {"parts": [{"text": text[i:i + 40]}]}}]}
+                self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\r\n\r\n".encode("utf-8"))
+                self.wfile.flush()
+                time.sleep(self.latency / 5)
+            self.close_connection = True
+            return
+        out = json.dumps({"candidates": [{"content": {"parts": [{"text": text + str(len(body))}]}}]}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+
+def start_gemini_stub(latency):
+    _GeminiStub.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _GeminiStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1beta"
+
+
+def bench_data(n_rows, reruns, workdir):
+    rows, names, classes = synthetic_weekly(n_rows)
+    ws = FakeWorksheet("weekly", rows)
+    store = SheetSyncStore(os.path.join(workdir, f"sheets_{n_rows}.sqlite3"))
+    cache = SheetCache(ttl=300, string_sheets=("weekly",))
+
+    with perf.timed("sync.full"): store.sync(ws)
+    ws.rows.extend(rows[1:11])
+    with perf.timed("sync.delta_10_rows"): store.sync(ws)
+    with perf.timed("load.read_normalize"): df = normalize_frame("weekly", store.read_frame("weekly"))
+    cache.put("weekly", df)
+    with perf.timed("index.weekly"): w_idx = cache.index("weekly", build_weekly_index, df)
+    with perf.timed("index.aggregates"):
+        agg = cache.index("weekly", build_weekly_aggregates, df)
+        agg.set_classes(build_class_index(_students_frame(classes)))
+    # TTL 만료 후 다시 적재: 증분 동기화로 받은 새 행만 캐시에 덧붙임 (인덱스/집계 유지)
+    ws.rows.extend([list(r) for r in rows[11:21]])
+    with perf.timed("load.ttl_renew_10_rows"):
+        full, new_rows = store.sync(ws)
+        if full or not cache.renew("weekly", new_rows): raise RuntimeError("renew failed")
+        df = cache.get("weekly")
+
+    rnd = random.Random(1)
+    for _ in range(reruns):
+        name = rnd.choice(names)
+        # 기존 방식: 매 rerun마다 전체 DataFrame을 boolean mask로 필터링
+        with perf.timed("report.rerun_mask_filter"):
+            my_w = df[df['이름'] == name]
+            pers = my_w['시기'].tolist()
+            sel = pers[-4:]
+            my_w[my_w['시기'].isin(sel)][['시기', '주간점수', '성취도점수']].melt('시기', var_name='종류', value_name='점수')
+            for p in sel: my_w[my_w['시기'] == p].iloc[0]
+        # 현재 방식: 캐시된 인덱스 + 미리 집계된 추이
+        with perf.timed("report.rerun_indexed"):
+            w_idx = cache.index("weekly", build_weekly_index, df)
+            agg = cache.index("weekly", build_weekly_aggregates, df)
+            sel = agg.periods(name)[-4:]
+            series = agg.student_series(name).set_index('시기', drop=False)
+            series.loc[sel, ['시기', '주간점수', '성취도점수']].melt('시기', var_name='종류', value_name='점수')
+            for p in sel: df.iloc[w_idx.by_period[(name, p)]]
+        with perf.timed("report.class_series"):
+            agg.class_series(next(iter(classes)))
+
+    writer = SheetWriter(os.path.join(workdir, f"journal_{n_rows}.sqlite3"), lambda _: ws, on_flushed=cache.patch)
+    batch = [rows[1 + i] for i in range(min(30, n_rows))]
+    with perf.timed("write.enqueue_flush_30_rows"):
+        writer.enqueue("weekly", batch)
+        writer.flush("weekly")
+
+
+def _students_frame(classes):
+    return pd.DataFrame([{'이름': n, '반': b} for b, ns in classes.items() for n in ns])
+
+
+def bench_ai(calls, latency, workdir, rec):
+    server, url = start_gemini_stub(latency)
+    client = GeminiClient("bench", base_url=url, max_concurrency=4)
+    perf.instrument_session(client.session)
+    cache = ResponseCache(os.path.join(workdir, "ai_cache.sqlite3"))
+    try:
+        def one(i):
+            with perf.timed("ai.generate"): return client.generate(f"학생{i} 프롬프트")
+        with perf.timed(f"ai.bulk_{calls}_calls"):
+            with ThreadPoolExecutor(max_workers=8, initializer=perf.activate, initargs=(rec,)) as pool:
+                list(pool.map(one, range(calls)))
+        key = cache_key(client.model, "캐시 프롬프트")
+        cache.put(key, client.generate("캐시 프롬프트"))
+        for _ in range(calls):
+            with perf.timed("ai.cache_hit"): cache.get(key)
+        for _ in range(3):
+            t0 = time.perf_counter()
+            stream = client.stream("스트리밍 프롬프트")
+            next(stream)
+            rec.record("ai.stream_first_chunk", time.perf_counter() - t0)
+            for _ in stream: pass
+    finally:
+        client.close()
+        server.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="GoodSense Math 오프라인 벤치마크")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="weekly 행 수 목록 (쉼표 구분)")
+    parser.add_argument("--reruns", type=int, default=50, help="리포트 rerun 반복 횟수")
+    parser.add_argument("--ai-calls", type=int, default=30, help="일괄 분석 AI 호출 수")
+    parser.add_argument("--ai-latency", type=float, default=0.05, help="가짜 Gemini 응답 지연(초)")
+    parser.add_argument("--json", help="결과를 JSON 파일로 저장")
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for n in [int(x) for x in args.sizes.split(",") if x.strip()]:
+            rec = perf.PerfRecorder()
+            perf.activate(rec)
+            bench_data(n, args.reruns, workdir)
+            results += [dict(r, rows=n) for r in rec.summary()]
+        if args.ai_calls:
+            rec = perf.PerfRecorder()
+            perf.activate(rec)
+            bench_ai(args.ai_calls, args.ai_latency, workdir, rec)
+            results += [dict(r, rows=None) for r in rec.summary()]
+    perf.activate(None)
+
+    print(f"{'rows':>8}  {'name':<32}{'count':>6}{'p50_ms':>11}{'p95_ms':>11}{'bytes':>10}")
+    for r in results:
+        rows, p50, p95 = ("-" if v is None else v for v in (r['rows'], r['p50_ms'], r['p95_ms']))
+        print(f"{rows:>8}  {r['name']:<32}{r['count']:>6}{p50:>11}{p95:>11}{r['bytes']:>10}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# ==========================================
+# Gemini API 공용 클라이언트
+# ==========================================
+# - requests.Session + 커넥션 풀 (keep-alive로 매 호출 TLS 연결을 새로 맺지 않음)
+# - 요청별 타임아웃 (연결, 응답)
+# - 429/5xx/네트워크 오류는 지터를 준 지수 백오프로 재시도 (Retry-After 헤더 우선)
+# - 세마포어로 동시 호출 수 제한 (동기/asyncio/스트리밍 호출이 같은 제한을 공유, 응답을 다 읽을 때까지 한 자리 차지)
+# - stream(): SSE 스트리밍 응답을 조각 단위로 전달 (연결 실패나 텍스트 없는 응답이면 일반 호출로 대체)
+GEMINI_BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+DEFAULT_MODEL = "gemini-2.0-flash-exp"
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class GeminiError(Exception):
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code  # HTTP 오류면 상태 코드, 통신 오류면 None
+
+
+class GeminiClient:
+    def __init__(self, api_key, model=DEFAULT_MODEL, base_url=GEMINI_BASE_URL,
+                 timeout=(5, 60), max_retries=3, max_concurrency=4,
+                 backoff=1.0, max_backoff=20.0):
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._sem = threading.BoundedSemaphore(max_concurrency)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(max_concurrency, 1) * 2)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Content-Type": "application/json", "x-goog-api-key": api_key})
+
+    def _url(self, method):
+        return f"{self.base_url}/models/{self.model}:{method}"
+
+    @staticmethod
+    def _body(prompt):
+        return {"contents": [{"parts": [{"text": prompt}]}]}
+
+    def _delay(self, attempt, res=None):
+        retry_after = res.headers.get("Retry-After") if res is not None else None
+        if retry_after:
+            try: return min(float(retry_after), self.max_backoff)
+            except ValueError: pass
+        delay = min(self.max_backoff, self.backoff * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.0)
+
+    @contextmanager
+    def _request(self, method, prompt, **kwargs):
+        # 재시도 포함 POST. 성공한 Response를 with 블록에 넘기고, 실패하면 GeminiError.
+        # 블록이 끝날 때까지(스트리밍 본문을 다 읽을 때까지) 동시 호출 한 자리를 차지함
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            res = None
+            self._sem.acquire()
+            try:
+                res = self.session.post(self._url(method), json=self._body(prompt), timeout=self.timeout, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                last_error = GeminiError(str(e))
+            if res is not None and res.status_code == 200:
+                try:
+                    with res: yield res
+                finally:
+                    self._sem.release()
+                return
+            self._sem.release()
+            if res is not None:
+                res.close()  # 실패 응답은 본문을 쓰지 않으므로 바로 연결 반환 (헤더는 그대로 읽을 수 있음)
+                last_error = GeminiError(f"HTTP {res.status_code}", res.status_code)
+                if res.status_code not in RETRYABLE_STATUS: raise last_error
+            if attempt < self.max_retries:
+                time.sleep(self._delay(attempt, res))
+        raise last_error
+
+    @staticmethod
+    def _text(payload):
+        try: return payload['candidates'][0]['content']['parts'][0]['text']
+        except (KeyError, IndexError, TypeError): raise GeminiError("응답 형식 오류")
+
+    def generate(self, prompt):
+        with self._request("generateContent", prompt) as res:
+            payload = res.json()
+        text = self._text(payload)
+        if not text: raise GeminiError("응답 형식 오류")
+        return text
+
+    def stream(self, prompt, fallback=True):
+        # streamGenerateContent(SSE)로 받은 텍스트 조각을 도착하는 대로 yield.
+        # 스트림 연결 자체가 실패하거나 텍스트 조각이 하나도 없으면 (안전 필터 차단 등)
+        # fallback=True일 때 일반 호출 결과를 한 번에 yield (일반 호출도 실패하면 GeminiError).
+        # 스트림 도중 끊기면 GeminiError (호출 측에서 일반 호출로 다시 받음)
+        received = False
+        try:
+            with self._request("streamGenerateContent", prompt, params={"alt": "sse"}, stream=True) as res:
+                for line in res.iter_lines():
+                    line = line.decode("utf-8").strip()
+                    if not line.startswith("data:"): continue
+                    data = line[5:].strip()
+                    if not data or data == "[DONE]": continue
+                    try: chunk = self._text(json.loads(data))
+                    except (GeminiError, ValueError): continue  # 텍스트 없는 조각 (안전 정보 등)
+                    if chunk:
+                        received = True
+                        yield chunk
+        except GeminiError:
+            if received or not fallback: raise
+        except requests.exceptions.RequestException as e:
+            raise GeminiError(str(e))
+        if received: return
+        if not fallback: raise GeminiError("응답 형식 오류")
+        yield self.generate(prompt)
+
+    async def agenerate(self, prompt):
+        # asyncio용: 같은 세션/세마포어를 쓰는 동기 호출을 스레드에서 실행
+        return await asyncio.to_thread(self.generate, prompt)
+
+    def close(self):
+        self.session.close()
+
+
+# ==========================================
+# AI 응답 캐시 (같은 입력으로 다시 누르면 API를 호출하지 않음)
+# ==========================================
+# 키: (모델, 완성된 프롬프트, 대상) 해시 → 응답 텍스트. 로컬 SQLite에 저장.
+# TTL이 지난 항목은 무시하고, 최대 개수를 넘으면 가장 오래 안 쓴 것부터 삭제.
+def cache_key(model, prompt, target_audience=None):
+    raw = json.dumps([model, prompt, target_audience], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, path, ttl=7 * 24 * 3600, max_entries=2000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        if os.path.dirname(path): os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS ai_cache ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+                "created_at REAL NOT NULL, used_at REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn: yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT response, created_at FROM ai_cache WHERE key=?", (key,)).fetchone()
+            if row is None: return None
+            if now - row[1] > self.ttl:
+                conn.execute("DELETE FROM ai_cache WHERE key=?", (key,))
+                return None
+            conn.execute("UPDATE ai_cache SET used_at=? WHERE key=?", (now, key))
+            return row[0]
+
+    def put(self, key, response):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO ai_cache (key, response, created_at, used_at) VALUES (?, ?, ?, ?)",
+                (key, response, now, now),
+            )
+            conn.execute("DELETE FROM ai_cache WHERE created_at < ?", (now - self.ttl,))
+            conn.execute(
+                "DELETE FROM ai_cache WHERE key IN ("
+                "SELECT key FROM ai_cache ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def get_or_create(self, key, produce, refresh=False):
+        # 저장된 결과가 있으면 반환, 없으면 produce()로 만들어 저장.
+        # refresh=True면 저장된 결과를 쓰지 않고 새로 만들어 갱신. 빈 결과는 저장하지 않음 (다음에 다시 생성)
+        if not refresh:
+            hit = self.get(key)
+            if hit is not None: return hit
+        text = produce()
+        if text and text.strip(): self.put(key, text)
+        return text
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM ai_cache")
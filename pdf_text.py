@@ -0,0 +1,186 @@
+import atexit
+import hashlib
+import io
+import multiprocessing
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+# ==========================================
+# PDF 텍스트 추출 (파일 내용 해시 기준 캐시 + 페이지 단위 지연 추출)
+# ==========================================
+# - 같은 파일이면 rerun마다 다시 파싱하지 않음 (내용 SHA-256 기준)
+# - max_chars까지만 앞 페이지부터 추출하고 멈춤. 나중에 더 필요하면 이어서 추출
+# - 남은 페이지가 많으면 (스캔본 등) 프로세스 풀로 구간을 나눠 병렬 추출
+#   (스레드가 여러 개 도는 Streamlit 서버에서 fork하면 자식이 잠금 상태를 물려받아 멈출 수 있으므로 spawn 사용.
+#    풀을 쓸 수 없으면 한 페이지씩 순서대로 추출)
+POOL_MIN_PAGES = 40
+POOL_CHUNK_PAGES = 10
+MAX_CACHED_FILES = 16
+
+_lock = threading.Lock()
+_docs = OrderedDict()  # sha256 -> {'pages': [추출된 앞쪽 페이지 텍스트], 'total': 전체 페이지 수, 'lock'}
+_pool = None
+
+
+def file_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _reader(data):
+    from pypdf import PdfReader  # 무거운 import는 실제로 PDF를 열 때만
+    return PdfReader(io.BytesIO(data))
+
+
+def _page_text(page):
+    try: return page.extract_text() or ""
+    except Exception: return ""
+
+
+def _extract_range(data, start, stop):
+    # 프로세스 풀 작업 단위: [start, stop) 페이지 텍스트 목록
+    reader = _reader(data)
+    return [_page_text(reader.pages[i]) for i in range(start, stop)]
+
+
+def _get_pool():
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=max(1, min(4, (os.cpu_count() or 2) - 1)),
+                                        mp_context=multiprocessing.get_context("spawn"))
+            atexit.register(_shutdown_pool)
+        return _pool
+
+
+def _shutdown_pool():
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None: pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _doc(key, data):
+    with _lock:
+        doc = _docs.get(key)
+        if doc is None:
+            doc = {'pages': [], 'total': len(_reader(data).pages), 'lock': threading.Lock()}
+            _docs[key] = doc
+        _docs.move_to_end(key)
+        while len(_docs) > MAX_CACHED_FILES:
+            _docs.popitem(last=False)
+        return doc
+
+
+def extract_pdf_text(data, max_chars=None, use_pool=True):
+    # data: PDF 파일 bytes. max_chars가 None이면 전체 추출
+    doc = _doc(file_hash(data), data)
+    with doc['lock']:
+        pages = doc['pages']
+        done = lambda: max_chars is not None and sum(len(t) for t in pages) >= max_chars
+        remaining = doc['total'] - len(pages)
+        if not done() and remaining > 0:
+            if use_pool and remaining >= POOL_MIN_PAGES:
+                try: _extract_parallel(data, pages, doc['total'], done)
+                except Exception: _shutdown_pool()  # 풀 오류 (BrokenProcessPool 등) → 아래에서 이어서 순서대로 추출
+            if not done() and len(pages) < doc['total']:
+                reader = _reader(data)
+                for i in range(len(pages), doc['total']):
+                    pages.append(_page_text(reader.pages[i]))
+                    if done(): break
+        text = "\n".join(pages)
+    return text if max_chars is None else text[:max_chars]
+
+
+def _extract_parallel(data, pages, total, done):
+    # 구간을 순서대로 받아 붙이다가 글자 수가 채워지면 나머지 작업은 취소
+    starts = range(len(pages), total, POOL_CHUNK_PAGES)
+    futures = [_get_pool().submit(_extract_range, data, s, min(s + POOL_CHUNK_PAGES, total)) for s in starts]
+    try:
+        for fut in futures:
+            pages.extend(fut.result())
+            if done(): break
+    finally:
+        for fut in futures: fut.cancel()
+
+
+# ==========================================
+# 문제 번호별 분할 (틀린 문제만 AI에 보내기 위함)
+# ==========================================
+# 줄 맨 앞의 "1.", "01)", "3번", "[12]", "문제 7", "0151" 같은 표기를 문제 시작 후보로 봄.
+# 본문 속 숫자(페이지 번호, 연도, 보기 등)를 걸러내기 위해 후보 중 번호가 커지는 가장 그럴듯한 흐름을 고름.
+#  - 흐름은 어느 번호에서든 시작할 수 있음 (교재 중간부터 낸 과제: 151, 152, ...)
+#  - 제목을 못 읽은 번호가 있어도 (1~5 다음 12~19) 건너뛴 개수만큼 감점하고 이어 붙임
+#  - 번호가 다시 1부터 시작하는 구간(정답지 등)은 앞 문제에 포함됨
+#  - 표기 없이 숫자만 있는 줄("3 x + 4 = 10")은 약한 후보: "3."처럼 표기가 있는 후보보다 점수를 낮게 줌
+PROBLEM_HEAD = re.compile(r'^[ \t]*(?P<word>문제[ \t]*)?(?P<open>[\[(])?(?P<n>\d{1,4})(?P<close>[\])])?[ \t]*(?:(?P<mark>[.)번])|\s)', re.MULTILINE)
+MAX_NUMBER_GAP = 30   # 이보다 크게 건너뛰면 같은 흐름으로 보지 않음
+SKIP_PENALTY = 0.1    # 건너뛴 번호 하나당 감점 (표기가 있는 문제 하나 = 1점)
+BARE_WEIGHT = 0.5     # 숫자만 있는 후보의 점수
+
+
+def parse_numbers(text):
+    # "3, 12, 5번" → [3, 5, 12]
+    return sorted(int(n) for n in re.findall(r'\d+', str(text)))
+
+
+def _heading_chain(text):
+    # 반환값: [(번호, 시작 위치)] - 번호가 커지는 후보 흐름 중 점수가 가장 높은 것
+    cands = []  # (번호, 시작 위치, 흐름에서 바로 앞 후보의 인덱스)
+    best = {}   # 번호 -> (점수, 후보 인덱스): 그 번호로 끝나는 가장 좋은 흐름
+    for m in PROBLEM_HEAD.finditer(text):
+        n = int(m.group('n'))
+        weight = 1.0 if any(m.group(g) for g in ('word', 'open', 'close', 'mark')) else BARE_WEIGHT
+        score, prev = weight, None
+        for p in range(max(0, n - MAX_NUMBER_GAP), n):
+            if p in best:
+                s = best[p][0] + weight - SKIP_PENALTY * (n - p - 1)
+                if s > score: score, prev = s, best[p][1]
+        cands.append((n, m.start(), prev))
+        if n not in best or score > best[n][0]: best[n] = (score, len(cands) - 1)
+    if not best: return []
+    # 점수가 같으면 먼저 끝나는 흐름 (문제 뒤에 붙은 정답지보다 문제 본문을 우선)
+    _, i = max(best.values(), key=lambda v: (v[0], -v[1]))
+    chain = []
+    while i is not None:
+        n, start, i = cands[i]
+        chain.append((n, start))
+    return chain[::-1]
+
+
+@lru_cache(maxsize=8)
+def segment_problems(text):
+    # 반환값: (머리말, {문제 번호: 문제 텍스트})
+    heads = _heading_chain(text)
+    if not heads: return text, {}
+    problems = {}
+    for i, (n, start) in enumerate(heads):
+        end = heads[i + 1][1] if i + 1 < len(heads) else len(text)
+        problems[n] = text[start:end].strip()
+    return text[:heads[0][1]], problems
+
+
+def select_problems(text, wrong_numbers, max_chars=15000, context_chars=500):
+    # 틀린 문제만 골라 짧은 머리말(단원명 등)과 함께 반환.
+    # 찾지 못한 번호는 바로 앞 번호 문제의 구간을 함께 보냄 (제목을 못 읽은 문제는 그 구간 안에 있음).
+    # 번호를 하나도 찾지 못하면 기존처럼 앞부분 max_chars 글자를 그대로 사용.
+    if not text: return ""
+    intro, problems = segment_problems(text)
+    wrong = parse_numbers(wrong_numbers)
+    if not any(n in problems for n in wrong): return text[:max_chars]
+    numbers = sorted(problems)
+    picked, missing = [], []
+    for n in wrong:
+        if n in problems: key = n
+        else:
+            missing.append(n)
+            before = [k for k in numbers if k < n]
+            key = before[-1] if before else None  # None: 첫 문제보다 앞 번호 → 머리말
+        if key not in picked: picked.append(key)
+    parts = [intro.strip()[:context_chars]] if intro.strip() and None not in picked else []
+    if missing: parts.append(f"(문제 {', '.join(map(str, missing))}번은 위치를 정확히 찾지 못해 주변 내용을 함께 보냅니다)")
+    parts += [intro.strip() if k is None else problems[k] for k in picked]
+    return "\n\n".join(p for p in parts if p)[:max_chars]
@@ -0,0 +1,161 @@
+import csv
+import io
+import json
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+# ==========================================
+# 성능 측정 (세션별 호출 수, p50/p95 지연, 전송 바이트)
+# ==========================================
+# - 기록기 찾기: activate(기록기)로 현재 실행 흐름에 연결하거나 (벤치마크, 작업 스레드),
+#   set_fallback(함수)로 연결되지 않은 흐름에서 찾을 함수를 등록 (앱: 세션 상태의 PerfRecorder)
+# - @track("이름") / with timed("이름"): 소요 시간을 기록
+# - instrument_session(requests 세션): 요청/응답 크기를 현재 측정 중인 항목의 바이트로 합산
+#   (스트리밍 응답은 본문을 읽는 만큼 합산)
+MAX_SAMPLES = 1000
+
+_recorder = ContextVar('perf_recorder', default=None)
+_active = ContextVar('perf_active', default=None)
+_fallback = None  # activate()되지 않은 흐름(콜백 등)에서 기록기를 찾는 함수
+
+
+class PerfRecorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}  # 이름 -> {'count', 'bytes', 'total', 'samples'}
+
+    def record(self, name, seconds, nbytes=0):
+        with self._lock:
+            s = self._stats.setdefault(name, {'count': 0, 'bytes': 0, 'total': 0.0, 'samples': deque(maxlen=MAX_SAMPLES)})
+            s['count'] += 1
+            s['bytes'] += nbytes
+            s['total'] += seconds
+            s['samples'].append(seconds)
+
+    def add_bytes(self, name, nbytes):
+        with self._lock:
+            s = self._stats.setdefault(name, {'count': 0, 'bytes': 0, 'total': 0.0, 'samples': deque(maxlen=MAX_SAMPLES)})
+            s['bytes'] += nbytes
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def summary(self):
+        # 이름순 목록: name, count, p50_ms, p95_ms, total_ms, bytes
+        with self._lock:
+            items = [(n, dict(s, samples=sorted(s['samples']))) for n, s in self._stats.items()]
+        out = []
+        for name, s in sorted(items):
+            samples = s['samples']
+            out.append({
+                'name': name,
+                'count': s['count'],
+                'p50_ms': round(_quantile(samples, 0.5) * 1000, 2) if samples else None,
+                'p95_ms': round(_quantile(samples, 0.95) * 1000, 2) if samples else None,
+                'total_ms': round(s['total'] * 1000, 2),
+                'bytes': s['bytes'],
+            })
+        return out
+
+    def to_json(self):
+        return json.dumps(self.summary(), ensure_ascii=False, indent=2)
+
+    def to_csv(self):
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=['name', 'count', 'p50_ms', 'p95_ms', 'total_ms', 'bytes'])
+        writer.writeheader()
+        writer.writerows(self.summary())
+        return buf.getvalue()
+
+
+def _quantile(sorted_samples, q):
+    # 최근접 순위 방식
+    idx = min(len(sorted_samples) - 1, max(0, math.ceil(q * len(sorted_samples)) - 1))
+    return sorted_samples[idx]
+
+
+def activate(recorder):
+    _recorder.set(recorder)
+
+
+def set_fallback(fn):
+    global _fallback
+    _fallback = fn
+
+
+def current():
+    rec = _recorder.get()
+    if rec is None and _fallback is not None:
+        try: rec = _fallback()
+        except Exception: rec = None
+    return rec
+
+
+@contextmanager
+def timed(name):
+    # 측정 중 instrument_session으로 들어온 바이트는 holder['bytes']에 합산됨
+    holder = {'bytes': 0}
+    token = _active.set(holder)
+    t0 = time.perf_counter()
+    try:
+        yield holder
+    finally:
+        elapsed = time.perf_counter() - t0
+        _active.reset(token)
+        parent = _active.get()
+        if parent is not None: parent['bytes'] += holder['bytes']
+        rec = current()
+        if rec is not None: rec.record(name, elapsed, holder['bytes'])
+
+
+def track(name):
+    # name이 함수면 호출 인자로 이름을 만듦 (예: 워크시트별로 나눠 기록)
+    def deco(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            label = name(*args, **kwargs) if callable(name) else name
+            with timed(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+def _byte_counter():
+    # 지금 측정 중인 항목에 바이트를 더하는 함수 (측정 중이 아니면 'http.other'로 기록)
+    holder = _active.get()
+    if holder is not None:
+        def add(n): holder['bytes'] += n
+        return add
+    rec = current()
+    if rec is not None: return lambda n: rec.add_bytes('http.other', n)
+    return lambda n: None
+
+
+def _response_hook(r, *args, **kwargs):
+    add = _byte_counter()
+    body = getattr(r.request, 'body', None)
+    add(len(body) if body else 0)
+    if not kwargs.get('stream'):
+        add(len(r.content or b""))
+        return r
+    # 스트리밍 응답은 본문을 미리 읽으면 안 되므로 (Content-Length도 없음) 읽히는 조각마다 합산
+    iter_content = r.iter_content
+    def counted(*a, **k):
+        for chunk in iter_content(*a, **k):
+            add(len(chunk.encode('utf-8') if isinstance(chunk, str) else chunk))
+            yield chunk
+    r.iter_content = counted
+    return r
+
+
+def instrument_session(session):
+    if session is None: return session
+    hooks = session.hooks.setdefault('response', [])
+    if _response_hook not in hooks: hooks.append(_response_hook)
+    return session
@@ -0,0 +1,144 @@
+import re
+import threading
+from bisect import bisect_left, bisect_right, insort
+
+import pandas as pd
+
+# ==========================================
+# 리포트용 성적 추이 집계 (weekly 행이 추가될 때마다 갱신)
+# ==========================================
+# - 시기("3월 2주차")를 (월, 주) 정렬 키로 변환해 순서대로 관리
+# - 학생별: 시기별 점수/평균, 이동평균, 반 내 백분위
+# - 반별: 시기별 점수 분포(정렬된 목록) → 반 평균·백분위를 전체 스캔 없이 계산
+# - 빈 칸이나 입력하지 않아 0으로 채워진 점수는 집계에서 뺌 (과제만 낸 주의 성취도 0점 등)
+# ※ 시트에 연도 정보가 없으므로 같은 (이름, 시기)가 여러 번 있으면 첫 행만 사용 (리포트와 동일)
+SCORE_COLS = ['주간점수', '주간평균', '성취도점수', '성취도평균']
+RANK_COLS = ['주간점수', '성취도점수']
+SCORE_GROUPS = {'주간점수': ('주간평균', '주간오답'), '성취도점수': ('성취도평균', '성취도오답')}  # 점수 -> (평균, 오답)
+ROLLING_WINDOW = 3
+PERIOD_RE = re.compile(r'(\d+)\s*월\s*(\d+)\s*주')
+
+
+def period_key(period):
+    # "3월 2주차" → (3, 2). 형식이 다르면 맨 뒤로 (문자열 순)
+    m = PERIOD_RE.search(str(period))
+    if m: return (int(m.group(1)), int(m.group(2)), "")
+    return (99, 99, str(period))
+
+
+def _num(v):
+    # 빈 칸이나 숫자가 아니면 None
+    try: return float(v)
+    except (TypeError, ValueError): return None
+
+
+def _scores(r):
+    out = {c: _num(r.get(c)) for c in SCORE_COLS}
+    for score, (avg, wrong) in SCORE_GROUPS.items():
+        # 점수와 평균이 0(또는 빈 칸)이고 오답도 없으면 입력하지 않은 칸으로 봄
+        if not out[score] and not out[avg] and not str(r.get(wrong) or "").strip():
+            out[score] = out[avg] = None
+    return out
+
+
+class WeeklyAggregates:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._students = {}   # 이름 -> {정렬 키: {'시기', 점수들...}}
+        self._classes = {}    # 이름 -> 반
+        self._class_src = None
+        self._dist = {}       # (반, 정렬 키, 열) -> 정렬된 점수 목록
+        self._class_keys = {} # 반 -> 점수가 있는 정렬 키 집합
+        self._labels = {}     # 정렬 키 -> 시기 문자열
+        self._series = {}     # 이름 -> 계산된 DataFrame (해당 학생/반이 바뀌면 삭제)
+
+    def add_rows(self, records):
+        # records: weekly 행 dict 목록 (새로 추가된 행만 넘기면 됨)
+        with self._lock:
+            for r in records:
+                name, period = r.get('이름'), r.get('시기')
+                if not name: continue
+                key = period_key(period)
+                rows = self._students.setdefault(name, {})
+                if key in rows: continue
+                rows[key] = {'시기': str(period), **_scores(r)}
+                self._labels.setdefault(key, str(period))
+                ban = self._classes.get(name)
+                if ban is not None: self._add_dist(ban, key, rows[key])
+                self._touch(name)
+
+    def set_classes(self, class_index):
+        # class_index: 반 -> 학생 이름 목록. 같은 객체면 다시 계산하지 않음
+        with self._lock:
+            if class_index is self._class_src: return
+            self._class_src = class_index
+            self._classes = {n: ban for ban, names in class_index.items() for n in names}
+            self._dist = {}
+            self._class_keys = {}
+            self._series = {}
+            for name, rows in self._students.items():
+                ban = self._classes.get(name)
+                if ban is None: continue
+                for key, row in rows.items(): self._add_dist(ban, key, row)
+
+    def _add_dist(self, ban, key, row):
+        self._class_keys.setdefault(ban, set()).add(key)
+        for c in RANK_COLS:
+            if row[c] is not None: insort(self._dist.setdefault((ban, key, c), []), row[c])
+
+    def _touch(self, name):
+        # 반 분포가 바뀌면 같은 반 학생들의 백분위도 바뀌므로 함께 삭제
+        self._series.pop(name, None)
+        ban = self._classes.get(name)
+        if ban is not None and self._class_src:
+            for n in self._class_src.get(ban, []): self._series.pop(n, None)
+
+    def periods(self, name):
+        # 학생의 시기 목록 (시간순)
+        with self._lock:
+            rows = self._students.get(name, {})
+            return [rows[k]['시기'] for k in sorted(rows)]
+
+    def percentile(self, ban, key, col, value):
+        # 반 내 백분위 (0~100, 높을수록 상위). 동점은 중간 순위
+        scores = self._dist.get((ban, key, col))
+        if not scores or value is None: return None
+        below = bisect_left(scores, value)
+        equal = bisect_right(scores, value) - below
+        return round(100 * (below + 0.5 * equal) / len(scores), 1)
+
+    def student_series(self, name):
+        # 시기순 DataFrame: 시기, 점수/평균, 이동평균, 반 내 백분위
+        with self._lock:
+            cached = self._series.get(name)
+            if cached is not None: return cached
+            rows = self._students.get(name, {})
+            keys = sorted(rows)
+            df = pd.DataFrame([rows[k] for k in keys], columns=['시기'] + SCORE_COLS).astype({c: float for c in SCORE_COLS})
+            for c in RANK_COLS:
+                # 최근 ROLLING_WINDOW회 중 점수가 있는 회차만 평균 (없으면 NaN)
+                df[f'{c}_이동평균'] = df[c].rolling(ROLLING_WINDOW, min_periods=1).mean().round(1)
+            ban = self._classes.get(name)
+            for c in RANK_COLS:
+                df[f'{c}_백분위'] = [self.percentile(ban, k, c, rows[k][c]) if ban is not None else None for k in keys]
+            self._series[name] = df
+            return df
+
+    def class_series(self, ban):
+        # 반의 시기별 평균 점수와 인원 수 (인원: 점수가 있는 학생 수가 가장 많은 열 기준)
+        with self._lock:
+            out = []
+            for k in sorted(self._class_keys.get(ban, ())):
+                row = {'시기': self._labels.get(k, ""), '인원': max(len(self._dist.get((ban, k, c), [])) for c in RANK_COLS)}
+                for c in RANK_COLS:
+                    scores = self._dist.get((ban, k, c), [])
+                    row[f'{c}_반평균'] = round(sum(scores) / len(scores), 1) if scores else None
+                out.append(row)
+            return pd.DataFrame(out)
+
+
+def build_weekly_aggregates(df_w):
+    agg = WeeklyAggregates()
+    if not df_w.empty and '이름' in df_w.columns and '시기' in df_w.columns:
+        agg.add_rows(df_w.to_dict('records'))
+    return agg
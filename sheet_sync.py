@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+# ==========================================
+# 누적형 시트(weekly/counseling) 증분 동기화 → 로컬 SQLite 저장소
+# ==========================================
+# 시트별로 "마지막으로 받은 행 번호 + 그 행의 해시"를 기억해 두고,
+# 다음 동기화 때는 그 행부터 끝까지만 범위로 읽어옵니다.
+#  - 헤더가 바뀌었거나 마지막으로 받은 행이 달라졌으면 (행 삭제/끝 행 수정) 전체를 다시 받음
+#  - 그 외에는 새로 추가된 행만 로컬 테이블에 덧붙임
+#  - 이전 행을 시트에서 직접 고친 것은 위 검사로 알 수 없으므로,
+#    마지막 전체 동기화 후 full_sync_interval(초)이 지나면 전체를 다시 받아 맞춤
+
+
+def _row_hash(row):
+    return hashlib.sha1(json.dumps(row, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def _headers(row):
+    # 시트 폭만큼 붙는 뒤쪽 빈 칸은 제거 (범위 읽기 결과와 비교할 수 있도록)
+    row = [str(x) for x in row]
+    while row and row[-1] == "": row.pop()
+    return row
+
+
+def _col_letter(n):
+    from gspread.utils import rowcol_to_a1
+    return rowcol_to_a1(1, max(n, 1))[:-1]
+
+
+class SheetSyncStore:
+    def __init__(self, path, full_sync_interval=3600):
+        self.path = path
+        self.full_sync_interval = full_sync_interval
+        self._lock = threading.Lock()
+        if os.path.dirname(path): os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sync_meta ("
+                "sheet TEXT PRIMARY KEY, headers TEXT NOT NULL, "
+                "synced_rows INTEGER NOT NULL, last_hash TEXT, full_synced_at REAL)"
+            )
+            # 이전 버전에서 만든 저장소 (full_synced_at 없음 → 다음 동기화 때 전체를 다시 받음)
+            cols = [r[1] for r in conn.execute("PRAGMA table_info(sync_meta)")]
+            if 'full_synced_at' not in cols: conn.execute("ALTER TABLE sync_meta ADD COLUMN full_synced_at REAL")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn: yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _table(name):
+        return '"rows_' + name.replace('"', '""') + '"'
+
+    def _meta(self, conn, name):
+        cur = conn.execute("SELECT headers, synced_rows, last_hash, full_synced_at FROM sync_meta WHERE sheet=?", (name,))
+        row = cur.fetchone()
+        if row is None: return None
+        return json.loads(row[0]), row[1], row[2], row[3]
+
+    def sync(self, worksheet, full=False):
+        # 반환값: (전체를 다시 받았는지, 받은 행 목록)
+        #  - 증분 동기화면 (False, 새로 추가된 행) → 호출 측은 이 행만 덧붙이면 됨
+        #  - 전체를 다시 받았으면 (True, 전체 행) → 호출 측은 read_frame()으로 다시 읽어야 함
+        # full=True이면 저장된 내용과 상관없이 전체를 다시 받음
+        name = worksheet.title
+        with self._lock, self._connect() as conn:
+            meta = self._meta(conn, name)
+            if full or meta is None or self._reconcile_due(meta[3]):
+                return self._full_sync(conn, name, worksheet)
+
+            headers, synced_rows, last_hash, _ = meta
+            last_col = _col_letter(len(headers))
+            # 헤더와 "마지막으로 받은 행 ~ 끝"을 한 번의 호출로 읽음
+            head_rng, tail_rng = worksheet.batch_get(["1:1", f"A{synced_rows}:{last_col}"])
+            cur_headers = _headers(head_rng[0]) if head_rng else []
+            tail = [self._pad(r, len(headers)) for r in tail_rng]
+            if cur_headers != headers:
+                return self._full_sync(conn, name, worksheet)
+            if synced_rows > 1 and (not tail or _row_hash(tail[0]) != last_hash):
+                return self._full_sync(conn, name, worksheet)
+
+            # tail[0]은 이미 받은 마지막 행 (데이터가 없었으면 헤더 행)
+            new_rows = tail[1:]
+            if new_rows:
+                self._insert(conn, name, len(headers), new_rows)
+                conn.execute(
+                    "UPDATE sync_meta SET synced_rows=?, last_hash=? WHERE sheet=?",
+                    (synced_rows + len(new_rows), _row_hash(new_rows[-1]), name),
+                )
+            return False, new_rows
+
+    def _reconcile_due(self, full_synced_at):
+        if self.full_sync_interval is None: return False
+        return full_synced_at is None or time.time() - full_synced_at >= self.full_sync_interval
+
+    def _full_sync(self, conn, name, worksheet):
+        values = worksheet.get_values()
+        headers = _headers(values[0]) if values else []
+        rows = [self._pad(r, len(headers)) for r in values[1:]]
+        table = self._table(name)
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+        cols = ", ".join(f"c{i} TEXT" for i in range(len(headers)))
+        conn.execute(f"CREATE TABLE {table} (row_no INTEGER PRIMARY KEY AUTOINCREMENT{', ' + cols if cols else ''})")
+        if rows: self._insert(conn, name, len(headers), rows)
+        conn.execute(
+            "INSERT OR REPLACE INTO sync_meta (sheet, headers, synced_rows, last_hash, full_synced_at) VALUES (?, ?, ?, ?, ?)",
+            (name, json.dumps(headers, ensure_ascii=False), 1 + len(rows), _row_hash(rows[-1]) if rows else None, time.time()),
+        )
+        return True, rows
+
+    @staticmethod
+    def _pad(row, width):
+        row = [str(x) for x in row[:width]]
+        return row + [""] * (width - len(row))
+
+    def _insert(self, conn, name, width, rows):
+        if width == 0: return
+        cols = ", ".join(f"c{i}" for i in range(width))
+        marks = ", ".join("?" for _ in range(width))
+        conn.executemany(f"INSERT INTO {self._table(name)} ({cols}) VALUES ({marks})", rows)
+
+    def read_frame(self, name):
+        with self._lock, self._connect() as conn:
+            meta = self._meta(conn, name)
+            if meta is None or not meta[0]: return pd.DataFrame()
+            headers = meta[0]
+            cols = ", ".join(f"c{i}" for i in range(len(headers)))
+            df = pd.read_sql_query(f"SELECT {cols} FROM {self._table(name)} ORDER BY row_no", conn)
+        df.columns = headers
+        return df
+
+    def last_full_sync(self, name):
+        # 마지막 전체 동기화 시각 (time.time() 기준, 없으면 None)
+        with self._lock, self._connect() as conn:
+            meta = self._meta(conn, name)
+        return meta[3] if meta else None
+
+    def reset(self, name=None):
+        with self._lock, self._connect() as conn:
+            names = [name] if name else [r[0] for r in conn.execute("SELECT sheet FROM sync_meta")]
+            for n in names:
+                conn.execute(f"DROP TABLE IF EXISTS {self._table(n)}")
+                conn.execute("DELETE FROM sync_meta WHERE sheet=?", (n,))
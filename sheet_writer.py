@@ -0,0 +1,231 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# ==========================================
+# 시트 쓰기 대기열 (로컬 저널 + append_rows 일괄 전송 + 재시도)
+# ==========================================
+# 1. 저장 요청은 먼저 로컬 SQLite 저널에 기록 (프로세스가 재시작돼도 남아 있음)
+# 2. 워크시트별로 쌓인 행을 append_rows 한 번으로 전송하고, 성공하면 저널에서 삭제
+# 3. 할당량 초과(429)/서버 오류(5xx)/네트워크 오류는 지수 백오프로 재시도
+#    (백그라운드 스레드가 남은 행을 계속 전송)
+# 4. 재시도해도 소용없는 오류(400/403/404, 워크시트 없음 등)는 해당 행을 '실패'로 옮기고 더 보내지 않음
+#    - 워크시트 단위 오류: 이번 묶음 전체를 실패 처리
+#    - 그 외: 한 행씩 나눠 보내서 문제 행만 실패 처리 (뒤의 정상 행은 계속 전송)
+#    - 실패 행은 failed_rows()로 확인하고 requeue_failed()/discard_failed()로 처리
+# ※ 전송 성공 직후 저널 삭제 전에 프로세스가 죽으면 해당 행이 한 번 더 추가될 수 있음
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+SHEET_ERROR_STATUS = {401, 403, 404}
+
+
+def is_retryable(exc):
+    import requests
+    from gspread.exceptions import APIError
+    if isinstance(exc, APIError):
+        code = getattr(exc.response, "status_code", None)
+        return code in RETRYABLE_STATUS
+    return isinstance(exc, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+
+def _is_sheet_error(exc):
+    # 행 내용과 상관없이 워크시트 전체에 해당하는 오류 (권한 없음, 시트 없음 등)
+    from gspread.exceptions import APIError, WorksheetNotFound
+    if isinstance(exc, WorksheetNotFound): return True
+    return isinstance(exc, APIError) and getattr(exc.response, "status_code", None) in SHEET_ERROR_STATUS
+
+
+class SheetWriter:
+    def __init__(self, path, get_worksheet, on_flushed=None, batch_size=100,
+                 base_delay=1.0, max_delay=60.0, idle_interval=5.0):
+        self.path = path
+        self.get_worksheet = get_worksheet  # 이름 -> gspread Worksheet
+        self.on_flushed = on_flushed        # (이름, 전송된 행 목록) -> None
+        self.batch_size = batch_size
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.idle_interval = idle_interval
+        self._flush_lock = threading.Lock()
+        self._status_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._status = {}  # 이름 -> {'last_error', 'last_flush_at', 'failures', 'retry_at'}
+        self._thread = None
+        if os.path.dirname(path): os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS write_journal ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, sheet TEXT NOT NULL, "
+                "row TEXT NOT NULL, queued_at REAL NOT NULL, error TEXT)"
+            )
+            # error: NULL이면 전송 대기, 값이 있으면 실패(더 이상 보내지 않음)
+            cols = [r[1] for r in conn.execute("PRAGMA table_info(write_journal)")]
+            if 'error' not in cols: conn.execute("ALTER TABLE write_journal ADD COLUMN error TEXT")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn: yield conn
+        finally:
+            conn.close()
+
+    def enqueue(self, sheet, rows):
+        # 반환값: 저널 id 목록 (outcome()으로 전송 결과 확인)
+        now = time.time()
+        with self._connect() as conn:
+            ids = [conn.execute(
+                "INSERT INTO write_journal (sheet, row, queued_at) VALUES (?, ?, ?)",
+                (sheet, json.dumps(list(r), ensure_ascii=False), now),
+            ).lastrowid for r in rows]
+        self._wake.set()
+        return ids
+
+    def outcome(self, ids):
+        # 반환값: (아직 대기 중인 행 수, 실패한 행의 오류 목록). 저널에 없는 id는 전송 완료
+        with self._connect() as conn:
+            marks = ", ".join("?" for _ in ids)
+            cur = conn.execute(f"SELECT error FROM write_journal WHERE id IN ({marks})", list(ids))
+            errors = [e for e, in cur.fetchall()]
+        return sum(e is None for e in errors), [e for e in errors if e is not None]
+
+    def _pending_sheets(self):
+        with self._connect() as conn:
+            return [r[0] for r in conn.execute("SELECT DISTINCT sheet FROM write_journal WHERE error IS NULL")]
+
+    def _next_batch(self, sheet, limit):
+        with self._connect() as conn:
+            cur = conn.execute(
+                "SELECT id, row FROM write_journal WHERE sheet=? AND error IS NULL ORDER BY id LIMIT ?",
+                (sheet, limit),
+            )
+            return [(i, json.loads(r)) for i, r in cur.fetchall()]
+
+    def _dead_letter(self, sheet, ids, exc):
+        with self._connect() as conn:
+            conn.executemany("UPDATE write_journal SET error=? WHERE id=?", [(str(exc) or type(exc).__name__, i) for i in ids])
+        with self._status_lock:
+            self._status.setdefault(sheet, {})['last_error'] = str(exc) or type(exc).__name__
+
+    def failed_rows(self, sheet=None):
+        # 실패한 행 목록: [{'id', 'sheet', 'row', 'error', 'queued_at'}]
+        sql = "SELECT id, sheet, row, error, queued_at FROM write_journal WHERE error IS NOT NULL"
+        args = ()
+        if sheet: sql, args = sql + " AND sheet=?", (sheet,)
+        with self._connect() as conn:
+            cur = conn.execute(sql + " ORDER BY id", args)
+            return [{'id': i, 'sheet': s, 'row': json.loads(r), 'error': e, 'queued_at': t} for i, s, r, e, t in cur.fetchall()]
+
+    def requeue_failed(self, ids=None):
+        # 원인을 해결한 뒤(시트 생성, 권한 부여 등) 실패 행을 다시 대기열로
+        with self._connect() as conn:
+            if ids is None: conn.execute("UPDATE write_journal SET error=NULL WHERE error IS NOT NULL")
+            else: conn.executemany("UPDATE write_journal SET error=NULL WHERE id=?", [(i,) for i in ids])
+        self._wake.set()
+
+    def discard_failed(self, ids=None):
+        with self._connect() as conn:
+            if ids is None: conn.execute("DELETE FROM write_journal WHERE error IS NOT NULL")
+            else: conn.executemany("DELETE FROM write_journal WHERE id=? AND error IS NOT NULL", [(i,) for i in ids])
+
+    def _backoff(self, failures):
+        delay = min(self.max_delay, self.base_delay * (2 ** (failures - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    def flush(self, sheet=None, max_attempts=1, block=True):
+        # 반환값: 대기열이 비었으면 True
+        # block=False이면 다른 곳에서 이미 전송 중일 때 바로 반환 (그쪽 루프가 새 행도 가져감)
+        if not self._flush_lock.acquire(blocking=block): return False
+        try:
+            sheets = [sheet] if sheet else self._pending_sheets()
+            results = [self._flush_sheet(s, max_attempts) for s in sheets]
+            return all(results)
+        finally:
+            self._flush_lock.release()
+
+    def _flush_sheet(self, sheet, max_attempts):
+        attempts = 0
+        single = 0  # 남은 "한 행씩 보내기" 횟수 (묶음이 행 문제로 실패했을 때 문제 행을 찾기 위함)
+        while True:
+            batch = self._next_batch(sheet, 1 if single else self.batch_size)
+            if not batch: return True
+            rows = [r for _, r in batch]
+            try:
+                self.get_worksheet(sheet).append_rows(rows)
+            except Exception as e:
+                if not is_retryable(e):
+                    if _is_sheet_error(e) or len(batch) == 1:
+                        self._dead_letter(sheet, [i for i, _ in batch], e)
+                        single = 0
+                    else: single = len(batch)
+                    continue
+                attempts += 1
+                delay = self._mark_failure(sheet, e)
+                if attempts >= max_attempts: return False
+                time.sleep(delay)
+                continue
+            with self._connect() as conn:
+                conn.executemany("DELETE FROM write_journal WHERE id=?", [(i,) for i, _ in batch])
+            self._mark_success(sheet)
+            attempts = 0
+            single = max(0, single - 1)
+            if self.on_flushed:
+                try: self.on_flushed(sheet, rows)
+                except Exception: pass
+
+    def _mark_failure(self, sheet, exc):
+        # 반환값: 다음 재시도까지 기다릴 시간(초)
+        with self._status_lock:
+            state = self._status.setdefault(sheet, {})
+            state['failures'] = state.get('failures', 0) + 1
+            state['last_error'] = str(exc)
+            delay = self._backoff(state['failures'])
+            state['retry_at'] = time.time() + delay
+            return delay
+
+    def _mark_success(self, sheet):
+        with self._status_lock:
+            state = self._status.setdefault(sheet, {})
+            state.update(failures=0, last_error=None, retry_at=None, last_flush_at=time.time())
+
+    def status(self):
+        # UI 표시용: 이름 -> {'pending', 'failed', 'oldest_queued_at', 'last_error', 'last_flush_at', 'retry_at'}
+        with self._connect() as conn:
+            cur = conn.execute(
+                "SELECT sheet, SUM(error IS NULL), SUM(error IS NOT NULL), MIN(CASE WHEN error IS NULL THEN queued_at END) "
+                "FROM write_journal GROUP BY sheet"
+            )
+            pending = {s: (n, f, t) for s, n, f, t in cur.fetchall()}
+        out = {}
+        with self._status_lock:
+            for sheet in set(pending) | set(self._status):
+                state = self._status.get(sheet, {})
+                n, failed, oldest = pending.get(sheet, (0, 0, None))
+                out[sheet] = {
+                    'pending': n,
+                    'failed': failed,
+                    'oldest_queued_at': oldest,
+                    'last_error': state.get('last_error'),
+                    'last_flush_at': state.get('last_flush_at'),
+                    'retry_at': state.get('retry_at'),
+                }
+        return out
+
+    def start(self):
+        # 백그라운드 전송 스레드 (시작 시 이전 프로세스가 남긴 저널도 전송)
+        if self._thread is not None: return
+        self._thread = threading.Thread(target=self._run, name="sheet-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.idle_interval)
+            self._wake.clear()
+            with self._status_lock:
+                retry_at = max([s.get('retry_at') or 0 for s in self._status.values()] + [0])
+            if retry_at > time.time():
+                time.sleep(retry_at - time.time())
+            try: self.flush(max_attempts=1)
+            except Exception: pass
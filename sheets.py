@@ -0,0 +1,172 @@
+import threading
+import time
+from collections import Counter, OrderedDict
+
+import pandas as pd
+
+# ==========================================
+# 시트 데이터 정규화 & 워크시트별 캐시
+# ==========================================
+WEEKLY_NUMERIC_COLS = ['주간점수', '주간평균', '성취도점수', '성취도평균', '과제']
+
+
+def normalize_frame(worksheet_name, df):
+    # 숫자형 변환 (주간 시트)
+    if worksheet_name == 'weekly':
+        for col in WEEKLY_NUMERIC_COLS:
+            if col in df.columns:
+                # 빈 문자열이나 에러가 날 경우 0으로 처리
+                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+
+    # 날짜/시기 문자열 변환
+    if '날짜' in df.columns: df['날짜'] = df['날짜'].astype(str)
+    if '시기' in df.columns: df['시기'] = df['시기'].astype(str)
+    return df
+
+
+# 워크시트 이름 -> DataFrame 캐시 (TTL + 최대 개수 제한, 오래 안 쓴 것부터 밀어냄)
+# ※ 반환된 DataFrame은 여러 세션이 공유하므로 호출 측에서 직접 수정하면 안 됩니다.
+# string_sheets: 문자열 그대로 적재하는 시트 (증분 동기화 저장소에서 읽는 시트).
+#   나머지 시트는 get_all_records()처럼 숫자 칸을 숫자로 바꿔 적재하므로, patch할 때도 같은 방식으로 변환.
+class SheetCache:
+    def __init__(self, ttl=300, max_entries=8, string_sheets=()):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.string_sheets = set(string_sheets)
+        # name -> [적재 시각, df, 인덱스 dict, 아직 동기화로 받지 않은 patch 행 Counter]
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        # TTL이 지났으면 None (항목은 renew()로 이어 쓸 수 있도록 남겨 둠)
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or time.monotonic() - entry[0] > self.ttl: return None
+            self._entries.move_to_end(name)
+            return entry[1]
+
+    def put(self, name, df):
+        with self._lock:
+            self._entries[name] = [time.monotonic(), df, {}, Counter()]
+            self._entries.move_to_end(name)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, name=None):
+        with self._lock:
+            if name is None: self._entries.clear()
+            else: self._entries.pop(name, None)
+
+    def patch(self, name, rows):
+        # 방금 시트에 추가한 행을 캐시된 DataFrame 뒤에 붙임 (다시 받지 않음).
+        # TTL은 원래 적재 시각 기준 유지 (다른 사람이 쓴 행도 주기적으로 반영되도록)
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None: return
+            padded = self._append(name, entry, rows)
+            # 다음 증분 동기화 때 같은 행이 다시 들어오면 중복으로 붙이지 않도록 기억
+            if padded is not None: entry[3].update(self._key(r) for r in padded)
+
+    def renew(self, name, rows):
+        # 증분 동기화로 받은 새 행만 덧붙이고 TTL을 다시 시작 (전체를 다시 읽지 않음).
+        # 반환값: 이어 쓸 항목이 없거나 열이 맞지 않아 다시 읽어야 하면 False
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None: return False
+            pending, new_rows = entry[3], []
+            for r in rows:
+                key = self._key(list(r) + [""] * (len(entry[1].columns) - len(r)))
+                if pending[key]: pending[key] -= 1  # 이 프로세스가 쓰고 이미 patch한 행
+                else: new_rows.append(r)
+            if new_rows and self._append(name, entry, new_rows) is None: return False
+            entry[0] = time.monotonic()
+            self._entries.move_to_end(name)
+            return True
+
+    @staticmethod
+    def _key(row):
+        return tuple(str(x) for x in row)
+
+    def _append(self, name, entry, rows):
+        # 잠금 안에서 호출. 반환값: 붙인 행 (열 개수가 맞지 않으면 항목을 지우고 None)
+        df, indexes = entry[1], entry[2]
+        cols = list(df.columns)
+        if not cols or any(len(r) > len(cols) for r in rows):
+            del self._entries[name]
+            return None
+        padded = [list(r) + [""] * (len(cols) - len(r)) for r in rows]
+        values = padded
+        if name not in self.string_sheets:
+            # 예: 반 "301"이 기존 행에서는 int 301 → 그대로 붙이면 반 목록 정렬 시 TypeError
+            from gspread.utils import numericise_all
+            values = [numericise_all(list(r)) for r in padded]
+        new_df = normalize_frame(name, pd.DataFrame(values, columns=cols))
+        # 데이터가 바뀌었으므로 인덱스는 다음 조회 때 다시 만듦
+        # (add_rows를 제공하는 증분형 인덱스는 새 행만 반영하고 유지)
+        kept = {}
+        for builder, idx in indexes.items():
+            if hasattr(idx, 'add_rows'):
+                idx.add_rows(new_df.to_dict('records'))
+                kept[builder] = idx
+        entry[1], entry[2] = pd.concat([df, new_df], ignore_index=True), kept
+        return padded
+
+    def index(self, name, builder, df):
+        # df(= 이 캐시에서 받은 DataFrame)로 만든 인덱스를 적재 1회당 한 번만 계산해서 재사용
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry[1] is df and builder in entry[2]: return entry[2][builder]
+        # 인덱스 생성은 잠금 밖에서 (다른 세션의 캐시 조회를 막지 않도록)
+        result = builder(df)
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry[1] is df: entry[2][builder] = result
+        return result
+
+
+# ==========================================
+# 조회용 인덱스 (rerun마다 boolean mask로 전체를 거르지 않도록)
+# ==========================================
+def build_class_index(df_std):
+    # 반 -> 학생 이름 목록 (정렬됨)
+    if df_std.empty or '반' not in df_std.columns or '이름' not in df_std.columns: return {}
+    return {ban: sorted(g['이름'].tolist()) for ban, g in df_std.groupby('반', sort=False)}
+
+
+def build_counseling_index(df_c):
+    # 이름 -> 상담 기록 (날짜 최신순)
+    if df_c.empty or '이름' not in df_c.columns: return {}
+    if '날짜' in df_c.columns: df_c = df_c.sort_values('날짜', ascending=False, kind='stable')
+    return {n: g for n, g in df_c.groupby('이름', sort=False)}
+
+
+class WeeklyIndex:
+    # by_student: 이름 -> 행 위치 목록 (시트 순서)
+    # by_period: (이름, 시기) -> 해당 시기의 첫 번째 행 위치
+    # 위치는 캐시된 DataFrame 기준 (df.iloc[위치]로 읽음). 행 복사 없이 만들고, 새 행은 add_rows로 이어서 반영
+    def __init__(self):
+        self.by_student = {}
+        self.by_period = {}
+        self._rows = 0
+        self._lock = threading.Lock()
+
+    def add_rows(self, records):
+        self._add([r.get('이름') for r in records], [r.get('시기') for r in records])
+
+    def _add(self, names, periods):
+        with self._lock:
+            for name, period in zip(names, periods):
+                pos = self._rows
+                self._rows += 1
+                if not name: continue
+                self.by_student.setdefault(name, []).append(pos)
+                self.by_period.setdefault((name, str(period)), pos)
+
+
+def build_weekly_index(df_w):
+    idx = WeeklyIndex()
+    if df_w.empty or '이름' not in df_w.columns or '시기' not in df_w.columns:
+        idx._rows = len(df_w)
+        return idx
+    idx._add(df_w['이름'].tolist(), df_w['시기'].astype(str).tolist())
+    return idx
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 저장소 최상위 모듈(sheets.py 등)을 import 할 수 있도록
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,109 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from gemini_client import GeminiClient, GeminiError
+
+
+class _Stub(BaseHTTPRequestHandler):
+    # plan: 요청마다 차례로 쓸 (상태 코드, 텍스트 조각 목록). 비면 (200, ["결과"])
+    protocol_version = "HTTP/1.1"
+    plan = []
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def log_message(self, *args): pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        code, texts = self.plan.pop(0) if self.plan else (200, ["결과"])
+        with self.lock:
+            _Stub.active += 1
+            _Stub.peak = max(_Stub.peak, _Stub.active)
+        try:
+            if code != 200:
+                self.send_response(code)
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"{}")
+            elif "stream" in self.path:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for t in texts:
+                    chunk = {"candidates": [{"content": {"parts": [{"text": t}]}}]} if t else {"candidates": [{"finishReason": "SAFETY"}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\r\n\r\n".encode())
+                    self.wfile.flush()
+                    time.sleep(0.05)
+                self.close_connection = True
+            else:
+                parts = [{"text": texts[0]}] if texts and texts[0] else []
+                out = json.dumps({"candidates": [{"content": {"parts": parts}}]}).encode()
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(out)))
+                self.end_headers()
+                self.wfile.write(out)
+        finally:
+            with self.lock: _Stub.active -= 1
+
+
+@pytest.fixture
+def client():
+    _Stub.plan, _Stub.active, _Stub.peak = [], 0, 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Stub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    c = GeminiClient("test", base_url=f"http://127.0.0.1:{server.server_address[1]}/v1beta",
+                     max_retries=2, max_concurrency=1, backoff=0.01)
+    yield c
+    c.close()
+    server.shutdown()
+
+
+def test_stream_yields_chunks(client):
+    _Stub.plan = [(200, ["안녕", "하세요"])]
+    assert list(client.stream("p")) == ["안녕", "하세요"]
+
+
+def test_empty_stream_falls_back_to_generate(client):
+    _Stub.plan = [(200, [""]), (200, ["일반 호출 결과"])]
+    assert list(client.stream("p")) == ["일반 호출 결과"]
+
+
+def test_blocked_response_is_an_error(client):
+    _Stub.plan = [(200, [""]), (200, [""])]
+    with pytest.raises(GeminiError):
+        list(client.stream("p"))
+    _Stub.plan = [(200, [""])]
+    with pytest.raises(GeminiError):
+        list(client.stream("p", fallback=False))
+
+
+def test_retries_then_raises_with_status(client):
+    _Stub.plan = [(503, []), (503, []), (503, [])]
+    with pytest.raises(GeminiError) as e:
+        client.generate("p")
+    assert e.value.status_code == 503
+    _Stub.plan = [(400, [])]
+    with pytest.raises(GeminiError) as e:
+        client.generate("p")
+    assert e.value.status_code == 400 and _Stub.plan == []
+
+
+def test_stream_holds_a_concurrency_slot_until_read(client):
+    _Stub.plan = [(200, ["가", "나", "다", "라"])]
+    stream = client.stream("p")
+    assert next(stream) == "가"
+    done = []
+    t = threading.Thread(target=lambda: done.append(client.generate("q")))
+    t.start()
+    time.sleep(0.3)
+    assert done == []  # max_concurrency=1: 스트림을 다 읽을 때까지 대기
+    assert list(stream) == ["나", "다", "라"]
+    t.join(5)
+    assert done == ["결과"]
+    assert _Stub.peak == 1
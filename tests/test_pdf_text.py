@@ -0,0 +1,121 @@
+import pdf_text
+from pdf_text import extract_pdf_text, parse_numbers, segment_problems, select_problems
+
+
+def _pdf(pages):
+    # 페이지마다 한 줄씩 글자를 쓴 최소한의 PDF
+    objs = [b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>", b""]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 12 Tf 40 780 Td ({text}) Tj ET".encode()
+        objs.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objs.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents %d 0 R "
+                    b"/Resources << /Font << /F1 1 0 R >> >> >>" % len(objs))
+        kids.append(len(objs))
+    objs[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % k for k in kids), len(kids))
+    objs.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    out, offsets = b"%PDF-1.4\n", []
+    for i, obj in enumerate(objs, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (i, obj)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1) + b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    return out + b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objs) + 1, len(objs), xref)
+
+
+def test_extract_is_lazy_and_cached():
+    data = _pdf([f"page {i}" for i in range(5)])
+    assert extract_pdf_text(data, max_chars=10, use_pool=False) == "page 0\npag"
+    assert len(pdf_text._docs[pdf_text.file_hash(data)]['pages']) == 2
+    assert extract_pdf_text(data, use_pool=False).split("\n") == [f"page {i}" for i in range(5)]
+
+
+def test_pool_extraction_matches_serial():
+    pages = [f"page {i}" for i in range(pdf_text.POOL_MIN_PAGES + 5)]
+    assert extract_pdf_text(_pdf(pages)).split("\n") == pages
+    assert pdf_text._pool._mp_context.get_start_method() == "spawn"
+
+
+def test_broken_pool_falls_back_to_serial(monkeypatch):
+    def broken(*args): raise RuntimeError("pool broken")
+    monkeypatch.setattr(pdf_text, "_extract_parallel", broken)
+    pages = [f"other {i}" for i in range(pdf_text.POOL_MIN_PAGES + 1)]
+    assert extract_pdf_text(_pdf(pages)).split("\n") == pages
+
+
+def _workbook(numbers, fmt="{n}. 문제 {n} 본문", intro="2단원 이차방정식"):
+    return "\n".join([intro] + [fmt.format(n=n) + f"\n보기 {n}-1  보기 {n}-2" for n in numbers])
+
+
+def test_parse_numbers():
+    assert parse_numbers("3, 12, 5번") == [3, 5, 12]
+    assert parse_numbers("0151, 0153") == [151, 153]
+
+
+def test_segments_numbered_problems():
+    intro, problems = segment_problems(_workbook(range(1, 6)))
+    assert intro.strip() == "2단원 이차방정식"
+    assert list(problems) == [1, 2, 3, 4, 5]
+    assert problems[3].startswith("3. 문제 3 본문")
+    assert "문제 4" not in problems[3]
+
+
+def test_starts_mid_workbook():
+    _, problems = segment_problems(_workbook(range(151, 161)))
+    assert list(problems) == list(range(151, 161))
+
+
+def test_four_digit_numbering():
+    _, problems = segment_problems(_workbook(range(151, 156), fmt="{n:04d} 문제 {n} 본문"))
+    assert list(problems) == [151, 152, 153, 154, 155]
+    assert "문제 153" in select_problems(_workbook(range(151, 156), fmt="{n:04d} 문제 {n} 본문"), "0153")
+
+
+def test_missed_headings_do_not_swallow_later_problems():
+    text = _workbook(list(range(1, 6)) + list(range(12, 20)))
+    _, problems = segment_problems(text)
+    assert list(problems) == list(range(1, 6)) + list(range(12, 20))
+    assert "문제 12" not in problems[5]
+
+
+def test_ignores_stray_numbers():
+    text = "2024 학년도 1학기\n" + _workbook(range(1, 8)).replace("보기 4-1", "\n37 쪽\n보기 4-1")
+    intro, problems = segment_problems(text)
+    assert list(problems) == list(range(1, 8))
+    assert "2024" in intro
+    assert "37 쪽" in problems[4]
+
+
+def test_marked_heading_beats_bare_number():
+    text = "2. 다음 중 옳은 것은?\n3 x + 4 = 10 일 때 x의 값\n3. 다음 값을 구하시오."
+    _, problems = segment_problems(text)
+    assert list(problems) == [2, 3]
+    assert "3 x + 4 = 10" in problems[2]
+    assert problems[3] == "3. 다음 값을 구하시오."
+
+
+def test_answer_key_is_not_taken_as_problems():
+    text = _workbook(range(1, 6)) + "\n정답\n" + "\n".join(f"{n}) ②" for n in range(1, 6))
+    _, problems = segment_problems(text)
+    assert problems[2].startswith("2. 문제 2 본문")
+
+
+def test_select_sends_only_wrong_problems():
+    out = select_problems(_workbook(range(1, 21)), "3, 17")
+    assert "문제 3 본문" in out and "문제 17 본문" in out
+    assert "문제 4 본문" not in out
+    assert "2단원 이차방정식" in out
+
+
+def test_select_sends_context_for_numbers_not_found():
+    text = _workbook(range(1, 11))
+    out = select_problems(text, "5, 15")
+    assert "문제 5 본문" in out
+    assert "15번은 위치를 정확히 찾지 못해" in out
+    assert "문제 10 본문" in out  # 15번이 있을 수 있는 마지막 구간
+
+
+def test_select_falls_back_to_head_of_text():
+    text = "번호 없는 학습지 " * 3000
+    assert select_problems(text, "3", max_chars=100) == text[:100]
+    assert select_problems(_workbook(range(1, 6)), "40", max_chars=50) == _workbook(range(1, 6))[:50]
@@ -0,0 +1,77 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import perf
+
+
+class _Chunked(BaseHTTPRequestHandler):
+    # Content-Length 없이 보내는 응답 (스트리밍 응답과 같은 형태)
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args): pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for _ in range(10): self.wfile.write(b"x" * 100 + b"\n")
+        self.close_connection = True
+
+
+@pytest.fixture
+def url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Chunked)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+
+
+@pytest.fixture
+def rec():
+    rec = perf.PerfRecorder()
+    perf.activate(rec)
+    yield rec
+    perf.activate(None)
+
+
+def _stats(rec):
+    return {r['name']: r for r in rec.summary()}
+
+
+def test_timed_and_track(rec):
+    @perf.track(lambda n: f"job:{n}")
+    def job(n): return n
+
+    with perf.timed("outer"):
+        job(1)
+        job(1)
+    stats = _stats(rec)
+    assert stats['job:1']['count'] == 2 and stats['outer']['count'] == 1
+    assert stats['outer']['p50_ms'] >= stats['job:1']['p50_ms']
+    assert rec.to_csv().splitlines()[0] == "name,count,p50_ms,p95_ms,total_ms,bytes"
+
+
+def test_counts_request_and_response_bytes(rec, url):
+    session = perf.instrument_session(requests.Session())
+    with perf.timed("plain"):
+        session.post(url, data=b"a" * 50).content
+    with perf.timed("stream"):
+        with session.post(url, data=b"a" * 50, stream=True) as res:
+            assert len(list(res.iter_lines())) == 10
+    stats = _stats(rec)
+    assert stats['plain']['bytes'] == 50 + 1010
+    assert stats['stream']['bytes'] == 50 + 1010
+
+
+def test_fallback_recorder():
+    rec = perf.PerfRecorder()
+    perf.set_fallback(lambda: rec)
+    try:
+        with perf.timed("via_fallback"): pass
+    finally:
+        perf.set_fallback(None)
+    assert _stats(rec)['via_fallback']['count'] == 1
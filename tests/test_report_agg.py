@@ -0,0 +1,82 @@
+import pandas as pd
+
+from report_agg import WeeklyAggregates, build_weekly_aggregates, period_key
+
+
+def _row(name, period, weekly=None, achieve=None):
+    # 입력하지 않은 쪽은 성적 입력 탭처럼 0으로 채워 저장된 행
+    w_sc, w_av = weekly or (0, 0)
+    a_sc, a_av = achieve or (0, 0)
+    return {'이름': name, '시기': period, '주간점수': w_sc, '주간평균': w_av, '주간오답': '',
+            '성취도점수': a_sc, '성취도평균': a_av, '성취도오답': ''}
+
+
+def test_period_key_orders_by_month_and_week():
+    periods = ["3월 10주차", "12월 1주차", "3월 2주차", "기타", "3 월 1 주"]
+    assert sorted(periods, key=period_key) == ["3 월 1 주", "3월 2주차", "3월 10주차", "12월 1주차", "기타"]
+    assert period_key("3월 2주차") == (3, 2, "")
+
+
+def test_periods_are_sorted_and_first_row_wins():
+    agg = build_weekly_aggregates(pd.DataFrame([
+        _row('김', '4월 1주차', weekly=(80, 70)),
+        _row('김', '3월 2주차', weekly=(90, 70)),
+        _row('김', '4월 1주차', weekly=(10, 70)),
+    ]))
+    assert agg.periods('김') == ['3월 2주차', '4월 1주차']
+    assert agg.student_series('김')['주간점수'].tolist() == [90, 80]
+
+
+def test_percentile_counts_ties_as_half():
+    agg = WeeklyAggregates()
+    agg.add_rows([_row(n, '3월 1주차', weekly=(s, 70)) for n, s in [('a', 60), ('b', 80), ('c', 80), ('d', 100)]])
+    agg.set_classes({'A': ['a', 'b', 'c', 'd']})
+    key = period_key('3월 1주차')
+    assert agg.percentile('A', key, '주간점수', 80) == 50.0
+    assert agg.percentile('A', key, '주간점수', 100) == 87.5
+    assert agg.percentile('B', key, '주간점수', 80) is None
+    assert agg.student_series('d')['주간점수_백분위'].tolist() == [87.5]
+
+
+def test_rolling_mean_uses_last_window():
+    agg = WeeklyAggregates()
+    agg.add_rows([_row('김', f'3월 {w}주차', weekly=(s, 70)) for w, s in [(1, 60), (2, 70), (3, 80), (4, 100)]])
+    assert agg.student_series('김')['주간점수_이동평균'].tolist() == [60.0, 65.0, 70.0, 83.3]
+
+
+def test_unentered_scores_are_skipped():
+    agg = WeeklyAggregates()
+    agg.add_rows([_row('김', '3월 1주차', achieve=(85, 70)),
+                  _row('김', '3월 2주차', weekly=(90, 80)),
+                  {'이름': '김', '시기': '3월 3주차', '주간점수': '', '성취도점수': 0, '성취도오답': '3'}])
+    agg.set_classes({'A': ['김']})
+    s = agg.student_series('김')
+    assert s['성취도점수_이동평균'].tolist() == [85.0, 85.0, 42.5]  # 오답이 있는 0점은 실제 점수
+    assert s['주간점수'].isna().tolist() == [True, False, True]
+    assert s['주간점수_백분위'].isna().tolist() == [True, False, True]
+    assert agg.class_series('A')['인원'].tolist() == [1, 1, 1]
+
+
+def test_add_rows_invalidates_classmates_series():
+    agg = WeeklyAggregates()
+    agg.add_rows([_row('a', '3월 1주차', weekly=(60, 70))])
+    agg.set_classes({'A': ['a', 'b']})
+    assert agg.student_series('a')['주간점수_백분위'].tolist() == [50.0]
+
+    agg.add_rows([_row('b', '3월 1주차', weekly=(100, 70))])
+    assert agg.student_series('a')['주간점수_백분위'].tolist() == [25.0]
+    assert agg.class_series('A')['주간점수_반평균'].tolist() == [80.0]
+
+
+def test_set_classes_rebuilds_distribution_only_for_new_index():
+    agg = WeeklyAggregates()
+    agg.add_rows([_row('a', '3월 1주차', weekly=(60, 70)), _row('b', '3월 1주차', weekly=(100, 70))])
+    classes = {'A': ['a'], 'B': ['b']}
+    agg.set_classes(classes)
+    first = agg.student_series('a')
+    agg.set_classes(classes)
+    assert agg.student_series('a') is first
+
+    agg.set_classes({'A': ['a', 'b']})
+    assert agg.student_series('a')['주간점수_백분위'].tolist() == [25.0]
+    assert agg.class_series('B').empty
@@ -0,0 +1,75 @@
+import pytest
+
+import gemini_client
+from gemini_client import ResponseCache, cache_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(gemini_client.time, 'time', lambda: now[0])
+    return now
+
+
+def test_cache_key_depends_on_model_prompt_and_audience():
+    keys = {cache_key("m", "p"), cache_key("m2", "p"), cache_key("m", "p2"), cache_key("m", "p", "학부모 전송용")}
+    assert len(keys) == 4
+    assert cache_key("m", "p", "학부모 전송용") == cache_key("m", "p", "학부모 전송용")
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "ai.sqlite3"), ttl=60)
+    cache.put("k", "응답")
+    clock[0] += 59
+    assert cache.get("k") == "응답"
+    clock[0] += 2
+    assert cache.get("k") is None
+    cache.put("k2", "응답2")  # put할 때 만료된 항목 정리
+    assert cache.get("k2") == "응답2"
+
+
+def test_evicts_least_recently_used(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "ai.sqlite3"), max_entries=2)
+    cache.put("a", "A")
+    clock[0] += 1
+    cache.put("b", "B")
+    clock[0] += 1
+    assert cache.get("a") == "A"  # a를 최근에 사용
+    clock[0] += 1
+    cache.put("c", "C")
+    assert cache.get("b") is None
+    assert cache.get("a") == "A" and cache.get("c") == "C"
+
+
+def test_survives_reopen_and_clear(tmp_path):
+    path = str(tmp_path / "ai.sqlite3")
+    ResponseCache(path).put("k", "응답")
+    cache = ResponseCache(path)
+    assert cache.get("k") == "응답"
+    cache.clear()
+    assert cache.get("k") is None
+
+
+def test_get_or_create_uses_cache_unless_refresh(tmp_path):
+    cache = ResponseCache(str(tmp_path / "ai.sqlite3"))
+    calls = []
+    def produce():
+        calls.append(1)
+        return f"결과 {len(calls)}"
+
+    assert cache.get_or_create("k", produce) == "결과 1"
+    assert cache.get_or_create("k", produce) == "결과 1"
+    assert cache.get_or_create("k", produce, refresh=True) == "결과 2"
+    assert cache.get_or_create("k", produce) == "결과 2"  # 새 결과로 갱신됨
+    assert len(calls) == 2
+
+
+def test_get_or_create_does_not_store_empty_or_failed_results(tmp_path):
+    cache = ResponseCache(str(tmp_path / "ai.sqlite3"))
+    assert cache.get_or_create("k", lambda: "  ") == "  "
+    assert cache.get("k") is None
+
+    def fail(): raise gemini_client.GeminiError("HTTP 429", 429)
+    with pytest.raises(gemini_client.GeminiError):
+        cache.get_or_create("k", fail)
+    assert cache.get("k") is None
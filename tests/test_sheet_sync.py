@@ -0,0 +1,89 @@
+import pytest
+
+import sheet_sync
+from bench import FakeWorksheet
+from sheet_sync import SheetSyncStore
+
+HEADERS = ['이름', '시기', '주간점수']
+
+
+def _sheet():
+    return FakeWorksheet('weekly', [list(HEADERS), ['김', '3월 1주차', '50'], ['이', '3월 1주차', '70']])
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SheetSyncStore(str(tmp_path / 'sheets.sqlite3'))
+
+
+def _values(store):
+    return store.read_frame('weekly').values.tolist()
+
+
+def test_delta_reads_only_new_rows(store):
+    ws = _sheet()
+    full, rows = store.sync(ws)
+    assert full and len(rows) == 2
+    ws.rows.append(['박', '3월 1주차', '80'])
+    calls = ws.calls
+    assert store.sync(ws) == (False, [['박', '3월 1주차', '80']])
+    assert ws.calls == calls + 1  # batch_get 한 번
+    assert _values(store)[-1] == ['박', '3월 1주차', '80']
+    assert store.sync(ws) == (False, [])
+    assert len(_values(store)) == 3
+
+
+def test_header_change_triggers_full_sync(store):
+    ws = _sheet()
+    store.sync(ws)
+    for r in ws.rows: r.append('')
+    ws.rows[0][-1] = '주간평균'
+    ws.rows.append(['박', '3월 2주차', '80', '65'])
+    assert store.sync(ws)[0]
+    df = store.read_frame('weekly')
+    assert list(df.columns) == HEADERS + ['주간평균']
+    assert df['주간평균'].tolist() == ['', '', '65']
+
+
+def test_deleted_rows_trigger_full_sync(store):
+    ws = _sheet()
+    store.sync(ws)
+    del ws.rows[1]
+    assert store.sync(ws) == (True, [['이', '3월 1주차', '70']])
+    assert _values(store) == [['이', '3월 1주차', '70']]
+    del ws.rows[1]
+    store.sync(ws)
+    assert _values(store) == []
+
+
+def test_edit_to_last_row_is_detected(store):
+    ws = _sheet()
+    store.sync(ws)
+    ws.rows[-1][2] = '75'
+    store.sync(ws)
+    assert _values(store)[-1] == ['이', '3월 1주차', '75']
+
+
+def test_edit_to_older_row_is_reconciled(store, monkeypatch):
+    ws = _sheet()
+    now = [1000.0]
+    monkeypatch.setattr(sheet_sync.time, 'time', lambda: now[0])
+    store.sync(ws)
+    ws.rows[1][2] = '95'
+    assert store.sync(ws) == (False, [])
+    assert _values(store)[0][2] == '50'  # 주기 전에는 증분 동기화만
+    now[0] += store.full_sync_interval
+    assert store.sync(ws)[0]
+    assert _values(store)[0][2] == '95'
+    assert store.last_full_sync('weekly') == now[0]
+
+
+def test_forced_full_sync_and_reset(store):
+    ws = _sheet()
+    store.sync(ws)
+    ws.rows[1][2] = '95'
+    assert store.sync(ws, full=True)[0]
+    assert _values(store)[0][2] == '95'
+    store.reset()
+    assert store.read_frame('weekly').empty
+    assert store.last_full_sync('weekly') is None
@@ -0,0 +1,131 @@
+import json
+
+import pytest
+import requests
+from gspread.exceptions import APIError, WorksheetNotFound
+
+import sheet_writer
+from bench import FakeWorksheet
+from sheet_writer import SheetWriter
+
+
+def _api_error(code):
+    res = requests.Response()
+    res.status_code = code
+    res._content = json.dumps({'error': {'code': code, 'message': f'HTTP {code}', 'status': 'X'}}).encode()
+    return APIError(res)
+
+
+class FlakyWorksheet(FakeWorksheet):
+    # errors: append_rows 호출마다 차례로 던질 예외 (None이면 정상 처리)
+    # bad: 이 값이 들어 있는 행이 포함되면 400
+    def __init__(self, errors=(), bad=None):
+        super().__init__('weekly', [['이름', '점수']])
+        self.errors = list(errors)
+        self.bad = bad
+        self.batches = []
+
+    def append_rows(self, rows):
+        self.batches.append(len(rows))
+        err = self.errors.pop(0) if self.errors else None
+        if err is not None: raise err
+        if self.bad and any(self.bad in r for r in rows): raise _api_error(400)
+        super().append_rows(rows)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    out = []
+    monkeypatch.setattr(sheet_writer.time, 'sleep', out.append)
+    return out
+
+
+def _writer(tmp_path, ws, **kwargs):
+    return SheetWriter(str(tmp_path / 'journal.sqlite3'), lambda name: ws, **kwargs)
+
+
+def test_batches_rows_and_calls_on_flushed(tmp_path):
+    ws = FlakyWorksheet()
+    flushed = []
+    writer = _writer(tmp_path, ws, batch_size=10, on_flushed=lambda name, rows: flushed.append(len(rows)))
+    ids = writer.enqueue('weekly', [[f'학생{i}', str(i)] for i in range(25)])
+    assert writer.flush('weekly')
+    assert ws.batches == [10, 10, 5]
+    assert flushed == [10, 10, 5]
+    assert len(ws.rows) == 26
+    assert writer.outcome(ids) == (0, [])
+
+
+def test_journal_survives_restart(tmp_path):
+    ws = FlakyWorksheet(errors=[_api_error(503)])
+    writer = _writer(tmp_path, ws)
+    ids = writer.enqueue('weekly', [['김', '90']])
+    assert not writer.flush('weekly', max_attempts=1)
+    assert writer.outcome(ids) == (1, [])
+    assert writer.status()['weekly']['pending'] == 1
+
+    writer2 = _writer(tmp_path, ws)
+    assert writer2.flush()
+    assert ws.rows[-1] == ['김', '90']
+    assert writer2.outcome(ids) == (0, [])
+
+
+def test_retryable_errors_back_off(tmp_path, sleeps):
+    ws = FlakyWorksheet(errors=[_api_error(429), requests.exceptions.ConnectionError(), None])
+    writer = _writer(tmp_path, ws, base_delay=1.0, max_delay=60.0)
+    writer.enqueue('weekly', [['김', '90']])
+    assert writer.flush('weekly', max_attempts=3)
+    assert len(sleeps) == 2
+    assert 0.5 <= sleeps[0] <= 1.0 and 1.0 <= sleeps[1] <= 2.0
+    assert writer.status()['weekly']['last_error'] is None
+
+
+def test_bad_row_is_dead_lettered_and_later_rows_flush(tmp_path, sleeps):
+    ws = FlakyWorksheet(bad='잘못된 행')
+    writer = _writer(tmp_path, ws)
+    first = writer.enqueue('weekly', [['김', '90'], ['잘못된 행', '0']])
+    later = writer.enqueue('weekly', [['이', '80']])
+    assert writer.flush('weekly')
+    assert ws.rows[1:] == [['김', '90'], ['이', '80']]
+    assert writer.outcome(first) == (0, ['APIError: [400]: HTTP 400'])
+    assert writer.outcome(later) == (0, [])
+    assert [f['row'] for f in writer.failed_rows()] == [['잘못된 행', '0']]
+    assert writer.status()['weekly']['failed'] == 1
+    assert sleeps == []
+
+    # 실패 행은 다시 보내지 않음
+    calls = len(ws.batches)
+    assert writer.flush()
+    assert len(ws.batches) == calls
+
+
+def test_sheet_errors_dead_letter_whole_batch(tmp_path):
+    ws = FlakyWorksheet(errors=[_api_error(403)])
+    writer = _writer(tmp_path, ws)
+    ids = writer.enqueue('weekly', [['김', '90'], ['이', '80']])
+    assert writer.flush('weekly')
+    assert ws.batches == [2]
+    assert writer.outcome(ids)[1] == ['APIError: [403]: HTTP 403'] * 2
+
+    def missing(name): raise WorksheetNotFound(name)
+    writer.get_worksheet = missing
+    ids = writer.enqueue('weekly', [['박', '70']])
+    writer.flush('weekly')
+    assert writer.outcome(ids) == (0, ['weekly'])
+
+
+def test_requeue_and_discard_failed(tmp_path):
+    ws = FlakyWorksheet(errors=[_api_error(404)])
+    writer = _writer(tmp_path, ws)
+    writer.enqueue('weekly', [['김', '90']])
+    writer.enqueue('weekly', [['이', '80']])
+    writer.flush('weekly')
+    failed = writer.failed_rows('weekly')
+    assert len(failed) == 2
+
+    writer.requeue_failed([failed[0]['id']])
+    assert writer.flush('weekly')
+    assert ws.rows[-1] == ['김', '90']
+    writer.discard_failed()
+    assert writer.failed_rows() == []
+    assert writer.status()['weekly']['failed'] == 0
@@ -0,0 +1,104 @@
+import pandas as pd
+
+import sheets
+
+from sheets import SheetCache, build_class_index, build_weekly_index, normalize_frame
+
+
+def _students():
+    # get_all_records()로 읽은 것처럼 숫자 칸은 int
+    return pd.DataFrame([
+        {'이름': '김', '반': 301, '출신중': '가중', '배정고': '가고', '거주지': ''},
+        {'이름': '이', '반': 302, '출신중': '나중', '배정고': '나고', '거주지': ''},
+    ])
+
+
+def test_patch_numericises_like_get_all_records():
+    cache = SheetCache()
+    df = _students()
+    cache.put('students', df)
+    cache.index('students', build_class_index, df)
+    cache.patch('students', [['박', '301', '다중', '다고', '']])
+
+    df2 = cache.get('students')
+    idx = cache.index('students', build_class_index, df2)
+    assert idx == {301: ['김', '박'], 302: ['이']}
+    assert sorted(idx.keys()) == [301, 302]
+
+
+def test_patch_keeps_strings_for_string_sheets():
+    cache = SheetCache(string_sheets=('weekly',))
+    df = normalize_frame('weekly', pd.DataFrame([['김', '3월 1주차', '과제1', '80', '90']],
+                                                columns=['이름', '시기', '과제명', '과제', '주간점수']))
+    cache.put('weekly', df)
+    cache.patch('weekly', [['이', '3월 1주차', '0123', '70', '85']])
+
+    df2 = cache.get('weekly')
+    assert df2['과제명'].tolist() == ['과제1', '0123']
+    assert df2['주간점수'].tolist() == [90, 85]
+    assert df2.iloc[build_weekly_index(df2).by_period[('이', '3월 1주차')]]['과제'] == 70
+
+
+def test_patch_with_unknown_columns_invalidates():
+    cache = SheetCache()
+    cache.put('students', _students())
+    cache.patch('students', [['박', '301', '다중', '다고', '', '남는 칸']])
+    assert cache.get('students') is None
+
+
+def _weekly_cache():
+    cache = SheetCache(ttl=300, string_sheets=('weekly',))
+    df = normalize_frame('weekly', pd.DataFrame([['김', '3월 1주차', '90']], columns=['이름', '시기', '주간점수']))
+    cache.put('weekly', df)
+    return cache, df
+
+
+def test_renew_appends_delta_and_restarts_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(sheets.time, 'monotonic', lambda: now[0])
+    cache, df = _weekly_cache()
+    seen = []
+
+    class Incremental:
+        def add_rows(self, records): seen.extend(r['이름'] for r in records)
+
+    builder = lambda d: Incremental()
+    inc = cache.index('weekly', builder, df)
+    now[0] += 301
+    assert cache.get('weekly') is None
+    assert cache.renew('weekly', [['이', '3월 1주차', '80']])
+    df2 = cache.get('weekly')
+    assert df2['이름'].tolist() == ['김', '이']
+    assert cache.index('weekly', builder, df2) is inc  # 증분형 인덱스는 다시 만들지 않음
+    assert seen == ['이']
+
+
+def test_renew_skips_rows_already_patched():
+    cache, _ = _weekly_cache()
+    cache.patch('weekly', [['이', '3월 1주차', '80']])
+    # 동기화로 같은 행(이 프로세스가 쓴 행)과 다른 강사가 쓴 행이 함께 들어옴
+    assert cache.renew('weekly', [['이', '3월 1주차', '80'], ['박', '3월 1주차', '70']])
+    assert cache.get('weekly')['이름'].tolist() == ['김', '이', '박']
+    assert cache.renew('weekly', [['이', '3월 1주차', '80']])  # 같은 내용의 새 행은 그대로 추가
+    assert cache.get('weekly')['이름'].tolist() == ['김', '이', '박', '이']
+
+
+def test_renew_without_entry_or_with_new_columns_asks_for_reload():
+    cache, _ = _weekly_cache()
+    assert not cache.renew('counseling', [])
+    assert not cache.renew('weekly', [['이', '3월 1주차', '80', '남는 칸']])
+    assert cache.get('weekly') is None
+
+
+def test_weekly_index_positions_follow_patches():
+    cache, df = _weekly_cache()
+    cache.patch('weekly', [['이', '3월 1주차', '80'], ['김', '3월 1주차', '70'], ['김', '3월 2주차', '60']])
+    df2 = cache.get('weekly')
+    idx = cache.index('weekly', build_weekly_index, df2)
+    assert idx.by_student == {'김': [0, 2, 3], '이': [1]}
+    assert idx.by_period[('김', '3월 1주차')] == 0  # 같은 시기는 첫 행
+
+    cache.patch('weekly', [['박', '3월 2주차', '50']])
+    df3 = cache.get('weekly')
+    assert cache.index('weekly', build_weekly_index, df3) is idx
+    assert df3.iloc[idx.by_period[('박', '3월 2주차')]]['주간점수'] == 50